@@ -13,6 +13,8 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import time
+
 from asgiref import sync
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.core.cache import cache
@@ -23,7 +25,7 @@ from rest_framework.request import Request
 from rest_framework_simplejwt.tokens import TokenError
 from shipchain_common.authentication import InternalRequest, passive_credentials_auth, PermissionedTokenUser
 
-from apps.shipments.models import AccessRequest
+from apps.shipments.models import AccessRequest, Endpoints
 
 
 class AsyncJsonAuthConsumer(AsyncJsonWebsocketConsumer):
@@ -32,20 +34,23 @@ class AsyncJsonAuthConsumer(AsyncJsonWebsocketConsumer):
     """
     async def connect(self):
         if await self._authenticate():
-            await self.channel_layer.group_add(self.scope['user'].id, self.channel_name)
-            organization_id = await sync.sync_to_async(self.scope['user'].token.get)('organization_id', None)
-            if organization_id:
-                await self.channel_layer.group_add(organization_id, self.channel_name)
+            for group in await self._owner_groups():
+                await self.channel_layer.group_add(group, self.channel_name)
             await self.accept('base64.authentication.jwt')
 
     async def disconnect(self, code):
         if self.scope['user']:
-            await self.channel_layer.group_discard(self.scope['user'].id, self.channel_name)
-            organization_id = await sync.sync_to_async(self.scope['user'].token.get)('organization_id', None)
-            if organization_id:
-                await self.channel_layer.group_discard(organization_id, self.channel_name)
+            for group in await self._owner_groups():
+                await self.channel_layer.group_discard(group, self.channel_name)
         await super().disconnect(code)
 
+    async def _owner_groups(self):
+        groups = [self.scope['user'].id]
+        organization_id = await sync.sync_to_async(self.scope['user'].token.get)('organization_id', None)
+        if organization_id:
+            groups.append(organization_id)
+        return groups
+
     async def receive(self, text_data=None, bytes_data=None, **kwargs):
         if text_data:
             json = await self.decode_json(text_data)
@@ -53,7 +58,7 @@ class AsyncJsonAuthConsumer(AsyncJsonWebsocketConsumer):
             refresh_request = 'event' in json and 'data' in json and json['event'] == 'refresh_jwt'
             if refresh_request:
                 self.scope['jwt'] = json['data']
-            if await self._authenticate() and not refresh_request:
+            if await self._authenticate(force=refresh_request) and not refresh_request:
                 await self.receive_json(json, **kwargs)
         else:
             raise ValueError("No text section for incoming WebSocket frame!")
@@ -62,7 +67,11 @@ class AsyncJsonAuthConsumer(AsyncJsonWebsocketConsumer):
         if await self._authenticate():
             await super().send(text_data, bytes_data, close)
 
-    async def _authenticate(self):
+    async def _authenticate(self, force=False):
+        # The validated user is cached for the connection until its token expires or a refresh_jwt is received
+        if not force and self.scope.get('user') and self.scope.get('jwt_exp', 0) > time.time():
+            return True
+
         if "jwt" not in self.scope:
             self.scope["jwt"] = await self._get_jwt_from_subprotocols()
         self.scope["user"] = await self._get_user()
@@ -70,6 +79,7 @@ class AsyncJsonAuthConsumer(AsyncJsonWebsocketConsumer):
                                       self.scope['url_route']['kwargs']['user_id'] != self.scope['user'].id):
             await self.close()
             return False
+        self.scope['jwt_exp'] = self.scope['user'].token.get('exp', 0)
 
         # Fake 'request' for use in serializers
         self.scope["request"] = Request(HttpRequest())
@@ -105,15 +115,27 @@ class DocsLambdaRequest(InternalRequest):
 
 class TransmissionTokenUser(PermissionedTokenUser):
     @property
-    def access_request_shipments(self):
-        cache_key = f'access_request_shipments_{self.id}'
-        shipment_ids = cache.get(cache_key)
+    def access_request_permissions(self):
+        """
+        Map of shipment_id to {endpoint name: PermissionLevel} granted by this user's approved AccessRequests.
+        Cached until one of the user's AccessRequests is saved or deleted.
+        """
+        cache_key = f'access_request_permissions_{self.id}'
+        permissions = cache.get(cache_key)
+
+        if permissions is None:
+            permissions = {}
+            for access_request in AccessRequest.objects.filter(requester_id=self.id, approved=True):
+                levels = permissions.setdefault(access_request.shipment_id, {})
+                for endpoint in Endpoints:
+                    level = getattr(access_request, f'{endpoint.name}_permission')
+                    if endpoint.name not in levels or levels[endpoint.name] < level:
+                        levels[endpoint.name] = level
+
+            cache.set(cache_key, permissions)
+
+        return permissions
 
-        if not shipment_ids:
-            shipment_ids = AccessRequest.objects.filter(
-                requester_id=self.id, approved=True
-            ).values_list('shipment_id', flat=True)
-
-            cache.set(cache_key, shipment_ids)
-
-        return shipment_ids
+    @property
+    def access_request_shipments(self):
+        return list(self.access_request_permissions)
@@ -15,7 +15,9 @@ limitations under the License.
 """
 from string import Template
 
+from asgiref.sync import async_to_sync
 from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
 from enumfields import Enum
 from rest_framework_json_api.renderers import JSONRenderer as JSONAPIRenderer
 from rest_framework.renderers import JSONRenderer
@@ -24,21 +26,45 @@ from apps.authentication import AsyncJsonAuthConsumer
 from apps.jobs.models import AsyncJob, JobState
 from apps.jobs.serializers import AsyncJobSerializer
 from apps.jobs.views import JobsViewSet
-from apps.shipments.geojson import render_point_feature
-from apps.shipments.models import Shipment, TrackingData, TelemetryData
+from apps.shipments.models import Shipment
 from apps.shipments.serializers import ShipmentTxSerializer, TelemetryResponseSerializer
 from apps.shipments.views import ShipmentViewSet, TelemetryViewSet
 
 
+channel_layer = get_channel_layer()  # pylint:disable=invalid-name
+
+
 class EventTypes(Enum):
     error = 0
     asyncjob_update = 1
     trackingdata_update = 2
     shipment_update = 3
     telemetrydata_update = 4
+    subscriptions_update = 5
+
+
+def shipment_group(shipment_id):
+    return f'shipment_{shipment_id}'
+
+
+def send_shipment_event(shipment, message):
+    """
+    Push a websocket event to the unfiltered sockets of the shipment owner and to the sockets subscribed to it
+    """
+    for group in (shipment.owner_id, shipment_group(shipment.id)):
+        async_to_sync(channel_layer.group_send)(group, message)
 
 
 class AppsConsumer(AsyncJsonAuthConsumer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.subscribed_shipments = set()
+
+    async def disconnect(self, code):
+        for shipment_id in self.subscribed_shipments:
+            await self.channel_layer.group_discard(shipment_group(shipment_id), self.channel_name)
+        await super().disconnect(code)
+
     async def jobs_update(self, event):
         job_json = await database_sync_to_async(self.render_async_job)(event['async_job_id'])
         await self.send(job_json)
@@ -70,23 +96,28 @@ class AppsConsumer(AsyncJsonAuthConsumer):
         )
 
     async def tracking_data_save(self, event):
-        tracking_data_json = await database_sync_to_async(self.render_async_tracking_data)(event['tracking_data_id'])
-        await self.send(tracking_data_json)
-
-    def render_async_tracking_data(self, data_id):
-        data = TrackingData.objects.filter(id=data_id)
+        # Payload is rendered once by the sender for every consumer in the group
+        await self.send(event['tracking_data_json'])
+
+    @staticmethod
+    def render_async_tracking_data(shipment_id, geojson):
+        """
+        :param shipment_id: Shipment the tracking update is pushed for
+        :param geojson: TrackingData/RouteTrackingData point feature rendered by render_point_feature, rendered once
+        for all of the shipments of a route
+        """
         return Template('{"event": "$event", "data": {"shipment_id": "$shipment_id", "feature": $geojson}}').substitute(
             event=EventTypes.trackingdata_update.name,
-            shipment_id=data.first().shipment_id,
-            geojson=render_point_feature(data),
+            shipment_id=shipment_id,
+            geojson=geojson,
         )
 
     async def telemetry_data_save(self, event):
-        telemetry_data_json = await database_sync_to_async(self.render_async_telemetry_data)(event['telemetry_data_id'])
-        await self.send(telemetry_data_json)
+        # Payload is rendered once by the sender for every consumer in the group
+        await self.send(event['telemetry_data_json'])
 
-    def render_async_telemetry_data(self, data_id):
-        telemetry = TelemetryData.objects.filter(id=data_id).first()
+    @staticmethod
+    def render_async_telemetry_data(telemetry):
         response = TelemetryResponseSerializer(telemetry)
         telemetry_json = JSONRenderer().render(response.data,
                                                renderer_context={'view': TelemetryViewSet()}).decode()
@@ -96,7 +127,53 @@ class AppsConsumer(AsyncJsonAuthConsumer):
         )
 
     async def receive_json(self, content, **kwargs):
+        event = content.get('event') if isinstance(content, dict) else None
+        shipment_ids = content.get('data') if isinstance(content, dict) else None
+        if event not in ('subscribe', 'unsubscribe') or not isinstance(shipment_ids, list):
+            await self.send_json({
+                "event": EventTypes.error.name,
+                "data": "Supported events are 'subscribe' and 'unsubscribe' with a list of shipment ids",
+            })
+            return
+
+        shipment_ids = {str(shipment_id) for shipment_id in shipment_ids}
+        if event == 'subscribe':
+            await self._subscribe(await database_sync_to_async(self.get_owned_shipment_ids)(shipment_ids))
+        else:
+            await self._unsubscribe(shipment_ids & self.subscribed_shipments)
+
         await self.send_json({
-            "event": EventTypes.error.name,
-            "data": "This websocket endpoint is read-only",
+            "event": EventTypes.subscriptions_update.name,
+            "data": sorted(self.subscribed_shipments),
         })
+
+    def get_owned_shipment_ids(self, shipment_ids):
+        owner_ids = [owner_id for owner_id in (self.scope['user'].id, self.scope['user'].token.get('organization_id'))
+                     if owner_id]
+        return set(Shipment.objects.filter(id__in=shipment_ids, owner_id__in=owner_ids).values_list('id', flat=True))
+
+    async def _subscribe(self, shipment_ids):
+        if not shipment_ids:
+            return
+
+        # Sockets with subscriptions only receive events for the shipments they are watching
+        if not self.subscribed_shipments:
+            for group in await self._owner_groups():
+                await self.channel_layer.group_discard(group, self.channel_name)
+
+        for shipment_id in shipment_ids - self.subscribed_shipments:
+            await self.channel_layer.group_add(shipment_group(shipment_id), self.channel_name)
+        self.subscribed_shipments |= shipment_ids
+
+    async def _unsubscribe(self, shipment_ids):
+        if not shipment_ids:
+            return
+
+        for shipment_id in shipment_ids:
+            await self.channel_layer.group_discard(shipment_group(shipment_id), self.channel_name)
+        self.subscribed_shipments -= shipment_ids
+
+        # Without any subscriptions the socket receives every event for its owner again
+        if not self.subscribed_shipments:
+            for group in await self._owner_groups():
+                await self.channel_layer.group_add(group, self.channel_name)
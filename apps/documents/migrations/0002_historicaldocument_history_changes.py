@@ -0,0 +1,19 @@
+# Generated by Django 3.0.8 on 2020-11-06 14:41
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0001_squashed_0003_add_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicaldocument',
+            name='history_changes',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -16,10 +16,11 @@ limitations under the License.
 
 import logging
 
-from influxdb_metrics.loader import log_metric
 from shipchain_common.exceptions import RPCError
 from shipchain_common.rpc import RPCClient
 
+from apps.metrics import log_metric
+
 LOG = logging.getLogger('transmission')
 
 
@@ -16,22 +16,49 @@ limitations under the License.
 
 import logging
 
-from botocore.errorfactory import ClientError
-
 from django.conf import settings
+from django.core.cache import cache
+from django.db import models
 
 from enumfields.drf import EnumSupportSerializerMixin
 from rest_framework_json_api import serializers
-from influxdb_metrics.loader import log_metric
 from shipchain_common.utils import UpperEnumField
 
-from apps.utils import S3PreSignedMixin
+from apps.metrics import log_metric
+from apps.utils import S3PreSignedMixin, presigned_s3_cache_key
 from .models import Document, DocumentType, FileType, UploadStatus
 from .rpc import DocumentRPCClient
+from .tasks import document_s3_key_cache_key, document_s3_restore_cache_key, put_document_in_s3_task
 
 LOG = logging.getLogger('transmission')
 
 
+def s3_keys_present(bucket, s3_keys):
+    """
+    The s3_keys found in the bucket. Keys seen within DOCUMENT_S3_KEY_TTL are read from the cache,
+    the others are checked with one list_objects_v2 per key prefix (the documents of a shipment share a prefix).
+    """
+    s3_keys = set(s3_keys)
+    cached = cache.get_many([document_s3_key_cache_key(s3_key) for s3_key in s3_keys])
+    present = {s3_key for s3_key in s3_keys if document_s3_key_cache_key(s3_key) in cached}
+
+    unknown = s3_keys - present
+    listed = set()
+    paginator = settings.S3_CLIENT.get_paginator('list_objects_v2')
+    for prefix in {s3_key.rsplit('/', 1)[0] + '/' for s3_key in unknown}:
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            listed.update(unknown.intersection(s3_object['Key'] for s3_object in page.get('Contents', [])))
+
+    if listed:
+        cache.set_many({document_s3_key_cache_key(s3_key): True for s3_key in listed},
+                       timeout=settings.DOCUMENT_S3_KEY_TTL)
+    return present | listed
+
+
+def thumbnail_key(document):
+    return document.s3_key.rsplit('.', 1)[0] + '-t.png'
+
+
 class BaseDocumentSerializer(S3PreSignedMixin, EnumSupportSerializerMixin, serializers.ModelSerializer):
     document_type = UpperEnumField(DocumentType, lenient=True, read_only=True, ints_as_names=True)
     file_type = UpperEnumField(FileType, lenient=True, read_only=True, ints_as_names=True)
@@ -57,11 +84,36 @@ class DocumentCreateSerializer(BaseDocumentSerializer):
         meta_fields = ('presigned_s3', )
 
 
+class DocumentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        documents = list(data.all() if isinstance(data, models.Manager) else data)
+
+        # Resolve the presence in the bucket and the cached pre-signed values of the whole list at once
+        completed = [document for document in documents if document.upload_status == UploadStatus.COMPLETE]
+        self.child.s3_keys_present = s3_keys_present(self.child._s3_bucket,
+                                                     [document.s3_key for document in completed])
+
+        presigned_s3_cache_keys = [
+            presigned_s3_cache_key('get', self.child._s3_bucket, key)
+            for document in completed for key in (document.s3_key, thumbnail_key(document))
+        ]
+        presigned_s3_cache_keys.extend(
+            presigned_s3_cache_key('post', self.child._s3_bucket, document.s3_key,
+                                   self.child.get_content_type(document.file_type.name.lower()))
+            for document in documents if document.upload_status != UploadStatus.COMPLETE
+        )
+        self.child.presigned_s3_cache = cache.get_many(presigned_s3_cache_keys)
+
+        return super().to_representation(documents)
+
+
 class DocumentSerializer(BaseDocumentSerializer):
     presigned_s3_thumbnail = serializers.SerializerMethodField()
+    s3_keys_present = None
 
     class Meta:
         model = Document
+        list_serializer_class = DocumentListSerializer
         fields = "__all__"
         if settings.PROFILES_ENABLED:
             read_only_fields = ('owner_id', 'document_type', 'file_type',)
@@ -73,23 +125,22 @@ class DocumentSerializer(BaseDocumentSerializer):
         if obj.upload_status != UploadStatus.COMPLETE:
             return super().get_presigned_s3(obj)
 
-        try:
-            settings.S3_CLIENT.head_object(Bucket=self._s3_bucket, Key=obj.s3_key)
-        except ClientError:
+        if self.s3_keys_present is not None:
+            if obj.s3_key not in self.s3_keys_present:
+                # Listing doesn't wait on Engine, the bucket is repopulated from vault in the background
+                if cache.add(document_s3_restore_cache_key(obj.id), True, timeout=settings.DOCUMENT_S3_KEY_TTL):
+                    put_document_in_s3_task.delay(obj.id)
+                return UploadStatus.PENDING.name
+
+        elif obj.s3_key not in s3_keys_present(self._s3_bucket, [obj.s3_key]):
             # The document doesn't exist anymore in the bucket. The bucket is going to be repopulated from vault
             result = DocumentRPCClient().put_document_in_s3(self._s3_bucket, obj.s3_key, obj.shipper_wallet_id,
                                                             obj.storage_id, obj.vault_id, obj.filename)
             if not result:
                 return None
+            cache.set(document_s3_key_cache_key(obj.s3_key), True, timeout=settings.DOCUMENT_S3_KEY_TTL)
 
-        url = settings.S3_CLIENT.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': f"{self._s3_bucket}",
-                'Key': obj.s3_key
-            },
-            ExpiresIn=settings.S3_URL_LIFE
-        )
+        url = self.get_presigned_s3_url(obj.s3_key)
 
         LOG.debug(f'Generated one time s3 url for: {obj.id}')
         log_metric('transmission.info', tags={'method': 'documents.generate_presigned_url', 'module': __name__})
@@ -100,16 +151,7 @@ class DocumentSerializer(BaseDocumentSerializer):
         if obj.upload_status != UploadStatus.COMPLETE:
             return None
 
-        thumbnail_key = obj.s3_key.rsplit('.', 1)[0] + '-t.png'
-
-        url = settings.S3_CLIENT.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': f"{self._s3_bucket}",
-                'Key': thumbnail_key
-            },
-            ExpiresIn=settings.S3_URL_LIFE
-        )
+        url = self.get_presigned_s3_url(thumbnail_key(obj))
 
         LOG.debug(f'Generated one time s3 url thumbnail for: {obj.id}')
         log_metric('transmission.info', tags={'method': 'documents.generate_presigned_s3_thumbnail',
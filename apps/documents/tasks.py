@@ -0,0 +1,91 @@
+# pylint:disable=invalid-name
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from shipchain_common.exceptions import RPCError
+
+from apps.jobs.models import AsyncActionType
+from apps.metrics import log_metric
+from apps.utils import UploadStatus
+from .models import Document
+from .rpc import DocumentRPCClient
+
+LOG = logging.getLogger('transmission')
+
+
+def document_s3_key_cache_key(s3_key):
+    return f'document_s3_key_{s3_key}'
+
+
+def document_s3_restore_cache_key(document_id):
+    return f'document_s3_restore_{document_id}'
+
+
+@shared_task(bind=True)
+def put_document_in_s3_task(self, document_id):
+    log_metric('transmission.info', tags={'method': 'documents_tasks.put_document_in_s3', 'module': __name__})
+    try:
+        document = Document.objects.select_related('shipment').get(id=document_id)
+
+        if DocumentRPCClient().put_document_in_s3(settings.DOCUMENT_MANAGEMENT_BUCKET, document.s3_key,
+                                                  document.shipper_wallet_id, document.storage_id, document.vault_id,
+                                                  document.filename):
+            cache.set(document_s3_key_cache_key(document.s3_key), True, timeout=settings.DOCUMENT_S3_KEY_TTL)
+    finally:
+        # A failed restore is attempted again by the next request for the document
+        cache.delete(document_s3_restore_cache_key(document_id))
+
+
+def document_id_from_s3_key(key):
+    # "sc_uuid/wallet_uuid/vault_uuid/document_uuid.ext"
+    return key.split('/', 3)[3].split('.')[0]
+
+
+def set_document_vault_hashes(vault_hashes):
+    for shipment, vault_hash in vault_hashes.values():
+        shipment.set_vault_hash(vault_hash, action_type=AsyncActionType.DOCUMENT)
+
+
+@shared_task(bind=True, autoretry_for=(RPCError,),
+             retry_backoff=3, retry_backoff_max=60, max_retries=10)
+def add_documents_from_s3(self, vault_id, records):
+    """
+    Save the documents uploaded to S3 for a vault, followed by one vault hash update per shipment.
+    Documents already COMPLETE are skipped so a retry resumes where the previous attempt failed.
+    """
+    log_metric('transmission.info', tags={'method': 'documents_tasks.add_documents_from_s3', 'module': __name__})
+    documents = Document.objects.select_related('shipment').in_bulk(
+        [document_id_from_s3_key(record['key']) for record in records])
+
+    vault_hashes = {}
+    try:
+        for record in records:
+            document = documents.get(document_id_from_s3_key(record['key']))
+            if not document:
+                LOG.warning(f'Document not found for S3 key {record["key"]}, skipping')
+                continue
+            if document.upload_status == UploadStatus.COMPLETE:
+                continue
+
+            storage_credentials_id, wallet_id, _, filename = record['key'].split('/', 3)
+            with cache.lock(vault_id, timeout=settings.VAULT_TIMEOUT):
+                signature = DocumentRPCClient().add_document_from_s3(record['bucket'], record['key'], wallet_id,
+                                                                     storage_credentials_id, vault_id, filename)
+
+            # Update upload status
+            document.upload_status = UploadStatus.COMPLETE
+            document.save()
+            vault_hashes[document.shipment_id] = (document.shipment, signature['hash'])
+    except Exception:
+        # The documents saved before the failure are skipped by the retry, they still get their vault hash
+        try:
+            set_document_vault_hashes(vault_hashes)
+        except Exception as exc:
+            LOG.error(f'Vault hash update of the documents saved to vault {vault_id} failed: {exc}')
+            log_metric('transmission.error', tags={'method': 'documents_tasks.add_documents_from_s3',
+                                                   'module': __name__, 'code': 'set_vault_hash'})
+        raise
+
+    set_document_vault_hashes(vault_hashes)
@@ -15,6 +15,7 @@ limitations under the License.
 """
 
 import logging
+from collections import defaultdict
 from urllib.parse import unquote_plus
 import re
 
@@ -28,14 +29,13 @@ from shipchain_common.permissions import HasViewSetActionPermissions
 from shipchain_common.viewsets import ActionConfiguration, ConfigurableGenericViewSet
 
 from apps.authentication import DocsLambdaRequest
-from apps.jobs.models import AsyncActionType
 from apps.permissions import get_owner_id, ShipmentExists, IsNestedOwnerShipperCarrierModerator
 from apps.shipments.models import AccessRequest, Endpoints, PermissionLevel
 from apps.utils import UploadStatus
 from .filters import DocumentFilterSet
 from .models import Document
-from .rpc import DocumentRPCClient
 from .serializers import DocumentSerializer, DocumentCreateSerializer
+from .tasks import add_documents_from_s3, document_id_from_s3_key
 
 LOG = logging.getLogger('transmission')
 
@@ -87,7 +87,7 @@ class DocumentViewSet(mixins.ConfigurableCreateModelMixin,
     }
 
     def get_queryset(self):
-        return self.queryset.filter(shipment__id=self.kwargs['shipment_pk'])
+        return self.queryset.select_related('shipment').filter(shipment__id=self.kwargs['shipment_pk'])
 
     def perform_create(self, serializer):
         if settings.PROFILES_ENABLED:
@@ -103,44 +103,41 @@ class S3Events(APIView):
     permission_classes = (DocsLambdaRequest,)
 
     def post(self, request, version, format=None):
-        # Get bucket and key from PUT event
+        # Get bucket and key from PUT events
+        records = []
         for record in request.data['Records']:
             bucket = record['s3']['bucket']['name']
             key = unquote_plus(record['s3']['object']['key'])
 
             LOG.info(f'Found new object {key} in bucket {bucket}')
 
-            if re.match(self.S3_PATH_REGEX, key):
-                # Parse IDs from key, "sc_uuid/wallet_uuid/vault_uuid/document_uuid.ext"
-                key_fields = dict()
-                key_fields['storage_credentials_id'], \
-                    key_fields['wallet_uuid'], \
-                    key_fields['vault_id'], \
-                    key_fields['filename'] = key.split('/', 3)
-
-                document_id = key_fields['filename'].split('.')[0]
-                document = Document.objects.filter(id=document_id).first()
-                if document:
-                    # Don't re-add document to vault if this event is just from repopulating the s3 cache
-                    if document.upload_status != UploadStatus.COMPLETE:
-                        # Save document to vault
-                        signature = DocumentRPCClient().add_document_from_s3(bucket, key,
-                                                                             key_fields['wallet_uuid'],
-                                                                             key_fields['storage_credentials_id'],
-                                                                             key_fields['vault_id'],
-                                                                             key_fields['filename'])
-
-                        # Update upload status
-                        document.upload_status = UploadStatus.COMPLETE
-                        document.save()
-                        document.shipment.set_vault_hash(signature['hash'], action_type=AsyncActionType.DOCUMENT)
-                else:
-                    message = f'Document not found with ID {document_id}, for {key} uploaded to {bucket}'
-                    LOG.warning(message)
-                    raise exceptions.ParseError(detail=message)
-            else:
+            if not re.match(self.S3_PATH_REGEX, key):
                 message = f'Document uploaded to {bucket} with key {key} does not match expected key regex'
                 LOG.warning(message)
                 raise exceptions.ParseError(detail=message)
 
+            records.append({'bucket': bucket, 'key': key})
+
+        upload_statuses = dict(Document.objects.filter(
+            id__in=[document_id_from_s3_key(record['key']) for record in records]
+        ).values_list('id', 'upload_status'))
+
+        vault_records = defaultdict(list)
+        for record in records:
+            document_id = document_id_from_s3_key(record['key'])
+            if document_id not in upload_statuses:
+                message = f'Document not found with ID {document_id}, for {record["key"]} ' \
+                          f'uploaded to {record["bucket"]}'
+                LOG.warning(message)
+                raise exceptions.ParseError(detail=message)
+
+            # Don't re-add document to vault if this event is just from repopulating the s3 cache
+            if upload_statuses[document_id] != UploadStatus.COMPLETE:
+                # Parse vault from key, "sc_uuid/wallet_uuid/vault_uuid/document_uuid.ext"
+                vault_records[record['key'].split('/', 3)[2]].append(record)
+
+        # Documents are saved to vault in the background, one task per vault
+        for vault_id, vault_document_records in vault_records.items():
+            add_documents_from_s3.delay(vault_id, vault_document_records)
+
         return Response(status=status.HTTP_204_NO_CONTENT)
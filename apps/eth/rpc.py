@@ -1,10 +1,10 @@
 import logging
 
-from influxdb_metrics.loader import log_metric
 from shipchain_common.exceptions import RPCError
 from shipchain_common.rpc import RPCClient
 
 from apps.eth.models import Event
+from apps.metrics import log_metric
 
 
 LOG = logging.getLogger('transmission')
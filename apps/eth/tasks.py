@@ -3,11 +3,11 @@ import logging
 from celery import shared_task
 from celery_once import QueueOnce
 from django.conf import settings
-from influxdb_metrics.loader import log_metric
 from rest_framework.exceptions import APIException
 from shipchain_common.exceptions import RPCError
 
 from apps.eth.rpc import EventRPCClient
+from apps.metrics import log_metric
 
 LOG = logging.getLogger('transmission')
 
@@ -4,7 +4,6 @@ from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 from django.db.models import Q
 from django_filters.rest_framework import DjangoFilterBackend
-from influxdb_metrics.loader import log_metric
 from rest_framework import mixins, viewsets, parsers, status, renderers, permissions, filters
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
@@ -15,6 +14,7 @@ from shipchain_common.exceptions import RPCError
 
 from apps.eth.models import EthAction, Event
 from apps.eth.serializers import EventSerializer, EthActionSerializer
+from apps.metrics import log_metric
 from apps.permissions import get_owner_id, shipment_owner_access_filter
 from apps.shipments.models import PermissionLink
 from apps.shipments.permissions import IsListenerOwner
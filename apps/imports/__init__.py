@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class ImportsConfig(AppConfig):
+    name = 'apps.imports'
+    label = 'imports'
+    verbose_name = 'imports'
+
+    def ready(self):
+        # pylint:disable=unused-import
+        import apps.imports.signals
+
+
+# pylint:disable=invalid-name
+default_app_config = 'apps.imports.ImportsConfig'
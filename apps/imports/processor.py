@@ -0,0 +1,243 @@
+"""
+Copyright 2020 ShipChain, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import codecs
+import csv
+import logging
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from shipchain_common.exceptions import RPCError
+
+from apps.metrics import log_metric
+from apps.shipments.models import LoadShipment, Location, Shipment, ShipmentSearchDocument
+from apps.shipments.models.search_document import build_search_document
+from apps.shipments.rpc import RPCClientFactory
+from apps.shipments.serializers import LocationSerializer, ShipmentVaultSerializer
+from apps.simple_history import TxmHistoricalRecords
+from apps.sns import SNSClient
+from .models import FileType, ProcessingStatus, ShipmentImport
+from .serializers import ShipmentImportRowSerializer
+
+LOG = logging.getLogger('transmission')
+
+# Shared pool for the Engine vault calls of import chunks; DB work stays on the task thread
+IMPORT_EXECUTOR = ThreadPoolExecutor(max_workers=max(settings.SHIPMENT_IMPORT_WORKERS, 1),
+                                     thread_name_prefix='shipment-import')
+
+# Location columns of an import file are prefixed by the location field, "ship_from_location.city"
+IMPORT_LOCATION_FIELDS = ('ship_from_location', 'ship_to_location', 'final_destination_location', 'bill_to_location')
+
+# Row errors kept in the report, the failed count covers all of them
+MAX_REPORTED_ERRORS = 1000
+
+
+class ShipmentImportProcessor:
+    """
+    Create the shipments of an import file streamed from S3, SHIPMENT_IMPORT_CHUNK_SIZE rows per transaction.
+    The report is saved after every chunk to expose the progress of the import, with the last row committed: a failed
+    import is resumed after that row.
+    """
+
+    def __init__(self, shipment_import):
+        self.shipment_import = shipment_import
+        # Row 1 is the header
+        self.report = {'rows': 0, 'created': 0, 'failed': 0, 'errors': [], 'last_row': 1}
+        if shipment_import.report and 'last_row' in shipment_import.report:
+            self.report.update({key: value for key, value in shipment_import.report.items() if key != 'error'})
+
+    def process(self):
+        log_metric('transmission.info', tags={'method': 'imports.process', 'module': __name__})
+
+        if self.shipment_import.file_type != FileType.CSV:
+            # There is no streaming reader for spreadsheets in Transmission's dependencies
+            self.report['error'] = f'{self.shipment_import.file_type.name} imports are not supported, use CSV'
+            self.save(ProcessingStatus.FAILED)
+            return
+
+        self.save(ProcessingStatus.RUNNING)
+        committed_report = deepcopy(self.report)
+        try:
+            rows = islice(enumerate(self.rows(), start=2), self.report['last_row'] - 1, None)
+            chunk = list(islice(rows, settings.SHIPMENT_IMPORT_CHUNK_SIZE))
+            while chunk:
+                self.process_chunk(chunk)
+                self.report['last_row'] = chunk[-1][0]
+                self.save(ProcessingStatus.RUNNING)
+                committed_report = deepcopy(self.report)
+                chunk = list(islice(rows, settings.SHIPMENT_IMPORT_CHUNK_SIZE))
+        except Exception as exc:
+            LOG.exception(f'Processing of ShipmentImport {self.shipment_import.id} failed')
+            # The rows of the failed chunk were rolled back, they are processed again when the import is resumed
+            self.report = committed_report
+            self.report['error'] = str(exc)
+            self.save(ProcessingStatus.FAILED)
+            raise
+
+        LOG.debug(f'Processed ShipmentImport {self.shipment_import.id}: {self.report["created"]} shipments created, '
+                  f'{self.report["failed"]} rows failed.')
+        self.save(ProcessingStatus.COMPLETE)
+
+    def save(self, processing_status):
+        self.shipment_import.processing_status = processing_status
+        self.shipment_import.report = self.report
+        ShipmentImport.objects.filter(id=self.shipment_import.id).update(processing_status=processing_status,
+                                                                         report=self.report)
+
+    def rows(self):
+        body = settings.S3_CLIENT.get_object(Bucket=settings.SHIPMENT_IMPORTS_BUCKET,
+                                             Key=self.shipment_import.s3_key)['Body']
+
+        # The body is decoded and parsed as it is read, the file is never fully in memory
+        for row in csv.DictReader(codecs.getreader('utf-8-sig')(body)):
+            # Empty cells are absent values, cells beyond the header are ignored
+            yield {column.strip(): value.strip() for column, value in row.items()
+                   if column and isinstance(value, str) and value.strip()}
+
+    def add_error(self, row_number, errors):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'row': row_number, 'errors': errors})
+
+    def validate_row(self, row):
+        shipment_data = {}
+        locations_data = {}
+        for column, value in row.items():
+            location_field, _, location_column = column.partition('.')
+            if location_column and location_field in IMPORT_LOCATION_FIELDS:
+                locations_data.setdefault(location_field, {})[location_column] = value
+            else:
+                shipment_data[column] = value
+
+        errors = {}
+        serializer = ShipmentImportRowSerializer(data=shipment_data)
+        if not serializer.is_valid():
+            errors.update(serializer.errors)
+
+        locations = {}
+        for location_field, location_data in locations_data.items():
+            location_serializer = LocationSerializer(data=location_data)
+            if location_serializer.is_valid():
+                locations[location_field] = location_serializer.validated_data
+            else:
+                errors[location_field] = location_serializer.errors
+
+        return serializer.validated_data if not errors else None, locations, errors
+
+    def create_vault(self, _shipment):
+        try:
+            return RPCClientFactory.get_client().create_vault(self.shipment_import.storage_credentials_id,
+                                                              self.shipment_import.shipper_wallet_id,
+                                                              self.shipment_import.carrier_wallet_id)
+        except RPCError as exc:
+            LOG.warning(f'Vault creation for ShipmentImport {self.shipment_import.id} failed: {exc}')
+            return None
+
+    def add_shipment_data(self, shipment_vault_data):
+        shipment, vault_data = shipment_vault_data
+        try:
+            RPCClientFactory.get_client().add_shipment_data(shipment.storage_credentials_id,
+                                                            shipment.shipper_wallet_id, shipment.vault_id, vault_data)
+        except RPCError as exc:
+            LOG.warning(f'Adding initial data for imported shipment {shipment.id} to vault failed: {exc}')
+
+    def process_chunk(self, rows):
+        valid_rows = []
+        for row_number, row in rows:
+            self.report['rows'] += 1
+            shipment_data, locations, errors = self.validate_row(row)
+            if errors:
+                self.add_error(row_number, errors)
+            else:
+                valid_rows.append((row_number, shipment_data, locations))
+
+        shipments, locations = [], []
+        for row_number, shipment_data, row_locations in valid_rows:
+            shipment = Shipment(owner_id=self.shipment_import.owner_id,
+                                storage_credentials_id=self.shipment_import.storage_credentials_id,
+                                shipper_wallet_id=self.shipment_import.shipper_wallet_id,
+                                carrier_wallet_id=self.shipment_import.carrier_wallet_id,
+                                updated_by=self.shipment_import.masquerade_id, **shipment_data)
+            for location_field, location_data in row_locations.items():
+                location = Location(**location_data)
+                setattr(shipment, location_field, location)
+                locations.append(location)
+            shipments.append((row_number, shipment))
+
+        if not shipments:
+            return
+
+        history = TxmHistoricalRecords()
+        with transaction.atomic():
+            # The rows are inserted before their vaults are created, so that a vault is only created for a shipment
+            # accepted by the database. Bulk inserts skip the post_save signals, the creation side effects are
+            # applied to the whole chunk
+            if locations:
+                Location.objects.bulk_create(locations)
+            Shipment.objects.bulk_create([shipment for _, shipment in shipments])
+
+            # Vault creation is the slow part of a shipment creation, the vaults of the chunk are created concurrently
+            vaults = IMPORT_EXECUTOR.map(self.create_vault, [shipment for _, shipment in shipments])
+
+            vaulted, failed = [], []
+            for (row_number, shipment), vault in zip(shipments, vaults):
+                if vault:
+                    shipment.vault_id, shipment.vault_uri = vault
+                    vaulted.append(shipment)
+                else:
+                    self.add_error(row_number, {'vault': ['Invalid response from Engine']})
+                    failed.append(shipment)
+
+            if failed:
+                # The shipments without a vault are not kept, neither are their locations
+                failed_locations = {getattr(shipment, f'{location_field}_id') for shipment in failed
+                                    for location_field in IMPORT_LOCATION_FIELDS} - {None}
+                Shipment.objects.filter(id__in=[shipment.id for shipment in failed]).delete()
+                Location.objects.filter(id__in=failed_locations).delete()
+                locations = [location for location in locations if location.id not in failed_locations]
+
+            if not vaulted:
+                return
+
+            Shipment.objects.bulk_update(vaulted, ['vault_id', 'vault_uri'])
+            if locations:
+                history.bulk_create_historical_records(locations, '+',
+                                                       history_user=self.shipment_import.masquerade_id)
+            history.bulk_create_historical_records(vaulted, '+', history_user=self.shipment_import.masquerade_id)
+
+            created = list(Shipment.objects.filter(id__in=[shipment.id for shipment in vaulted]).select_related(
+                *IMPORT_LOCATION_FIELDS).prefetch_related('shipment_tags'))
+            ShipmentSearchDocument.objects.bulk_create([
+                ShipmentSearchDocument(shipment_id=shipment.id, document=build_search_document(shipment))
+                for shipment in created
+            ])
+
+            for shipment in created:
+                # Created one at a time for the LOAD contract job queued by its post_save
+                LoadShipment.objects.create(shipment=shipment, funding_type=Shipment.FUNDING_TYPE,
+                                            contracted_amount=Shipment.SHIPMENT_AMOUNT)
+
+        list(IMPORT_EXECUTOR.map(self.add_shipment_data,
+                                 [(shipment, ShipmentVaultSerializer(shipment).data) for shipment in created]))
+
+        if settings.SNS_CLIENT:
+            for shipment in created:
+                SNSClient().shipment_update(shipment)
+
+        self.report['created'] += len(created)
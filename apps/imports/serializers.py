@@ -21,7 +21,8 @@ from rest_framework_json_api import serializers
 from rest_framework import status
 from shipchain_common.utils import UpperEnumField
 
-from apps.utils import S3PreSignedMixin, UploadStatus
+from apps.shipments.models import Shipment
+from apps.utils import S3PreSignedMixin, UploadStatus, invalidate_profiles_wallet_ids
 from .models import ShipmentImport, ProcessingStatus, FileType
 
 
@@ -63,6 +64,10 @@ class ShipmentImportCreateSerializer(ShipmentImportSerializer):
             response = settings.REQUESTS_SESSION.get(f'{settings.PROFILES_URL}/api/v1/wallet/{shipper_wallet_id}/',
                                                      headers={'Authorization': 'JWT {}'.format(self.context['auth'])})
 
+            # A cached wallet list disagreeing with Profiles about this wallet is stale
+            invalidate_profiles_wallet_ids(self.context['request'].user.id, shipper_wallet_id,
+                                           has_access=response.status_code == status.HTTP_200_OK)
+
             if response.status_code != status.HTTP_200_OK:
                 raise serializers.ValidationError('User does not have access to this wallet in ShipChain Profiles')
 
@@ -79,3 +84,23 @@ class ShipmentImportCreateSerializer(ShipmentImportSerializer):
                     'User does not have access to this storage credential in ShipChain Profiles')
 
         return storage_credentials_id
+
+
+class ShipmentImportRowSerializer(serializers.ModelSerializer):
+    """
+    Shipment schema fields of a row of an import file, the other columns are ignored.
+    The wallets and storage credentials are the ShipmentImport's, the locations are validated separately.
+    """
+    class Meta:
+        model = Shipment
+        fields = ('carriers_scac', 'forwarders_scac', 'nvocc_scac', 'shippers_reference', 'forwarders_reference',
+                  'forwarders_shipper_id', 'carriers_instructions', 'special_instructions', 'pro_number',
+                  'bill_master', 'bill_house', 'bill_subhouse', 'payment_terms', 'vessel_name', 'voyage_number',
+                  'mode_of_transport_code', 'package_qty', 'weight_gross', 'volume', 'container_qty', 'weight_dim',
+                  'weight_chargeable', 'docs_received_act', 'docs_approved_act', 'pickup_appt', 'pickup_est',
+                  'loading_est', 'loading_act', 'departure_est', 'departure_act', 'delivery_appt_act',
+                  'port_arrival_est', 'delivery_est', 'delivery_attempt', 'cancel_requested_date_act',
+                  'cancel_confirmed_date_act', 'customs_filed_date_act', 'customs_hold_date_act',
+                  'customs_release_date_act', 'container_type', 'port_arrival_locode', 'final_port_locode',
+                  'import_locode', 'lading_locode', 'origin_locode', 'us_routed', 'import_customs_mode',
+                  'us_export_port', 'trailer_number', 'seal_number', 'is_master_bol', 'nmfc_class', 'is_hazmat')
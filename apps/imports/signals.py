@@ -0,0 +1,19 @@
+import logging
+
+from django.db import transaction
+from django.dispatch import receiver
+from fieldsignals.signals import post_save_changed
+
+from apps.utils import UploadStatus
+from .models import ShipmentImport, ProcessingStatus
+from .tasks import process_shipment_import
+
+LOG = logging.getLogger('transmission')
+
+
+@receiver(post_save_changed, sender=ShipmentImport, fields=['upload_status'],
+          dispatch_uid='shipmentimport_upload_status_changed')
+def shipmentimport_upload_status_changed(sender, instance, changed_fields, **kwargs):
+    if instance.upload_status == UploadStatus.COMPLETE and instance.processing_status == ProcessingStatus.PENDING:
+        LOG.debug(f'ShipmentImport {instance.id} uploaded, queuing its processing')
+        transaction.on_commit(lambda: process_shipment_import.delay(instance.id))
@@ -0,0 +1,24 @@
+# pylint:disable=invalid-name
+import logging
+
+from celery import shared_task
+
+from apps.metrics import log_metric
+from .models import ShipmentImport, ProcessingStatus
+from .processor import ShipmentImportProcessor
+
+LOG = logging.getLogger('transmission')
+
+
+@shared_task(bind=True, autoretry_for=(Exception,),
+             retry_backoff=3, retry_backoff_max=60, max_retries=10)
+def process_shipment_import(self, shipment_import_id):
+    log_metric('transmission.info', tags={'method': 'imports_tasks.process_shipment_import', 'module': __name__})
+    shipment_import = ShipmentImport.objects.get(id=shipment_import_id)
+
+    # A retry resumes a failed import after its last committed row
+    if shipment_import.processing_status not in (ProcessingStatus.PENDING, ProcessingStatus.FAILED):
+        LOG.debug(f'ShipmentImport {shipment_import_id} already processed')
+        return
+
+    ShipmentImportProcessor(shipment_import).process()
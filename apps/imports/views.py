@@ -20,9 +20,9 @@ from django.conf import settings
 from django_filters import rest_framework as filters
 from rest_framework import viewsets, permissions, status, mixins
 from rest_framework.response import Response
-from influxdb_metrics.loader import log_metric
 from shipchain_common.authentication import get_jwt_from_request
 
+from apps.metrics import log_metric
 from apps.permissions import IsOwner, get_owner_id, owner_access_filter
 from .filters import ShipmentImportFilterSet
 from .models import ShipmentImport
@@ -63,7 +63,8 @@ class ShipmentImportsViewSet(mixins.CreateModelMixin,
         LOG.debug('Creating a ShipmentImport document object')
         log_metric('transmission.info', tags={'method': 'imports.create', 'module': __name__})
 
-        serializer = ShipmentImportCreateSerializer(data=request.data, context={'auth': get_jwt_from_request(request)})
+        serializer = ShipmentImportCreateSerializer(data=request.data, context={'auth': get_jwt_from_request(request),
+                                                                                 'request': request})
         serializer.is_valid(raise_exception=True)
         doc_obj = self.perform_create(serializer)
 
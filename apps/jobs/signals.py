@@ -1,27 +1,42 @@
 import logging
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from django.conf import settings
 from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
 from django.db.models.signals import post_save
 from django.dispatch import Signal, receiver
 from redis.lock import LockError
-from influxdb_metrics.loader import log_metric
 
+from apps.metrics import log_metric
 from apps.shipments.models import Shipment
-from .models import AsyncJob, Message, MessageType, JobState
+from .models import AsyncAction, AsyncJob, Message, MessageType, JobState
 
 # pylint:disable=invalid-name
 job_update = Signal(providing_args=["message", "shipment"])
-channel_layer = get_channel_layer()
 LOG = logging.getLogger('transmission')
 
 
 @receiver(post_save, sender=AsyncJob, dispatch_uid='asyncjob_post_save')
-def asyncjob_post_save(sender, instance, **kwargs):
-    # Notify websockets of any AsyncJob create/updates
-    async_to_sync(channel_layer.group_send)(instance.shipment.owner_id,
-                                            {"type": "jobs.update", "async_job_id": instance.id})
+def asyncjob_post_save(sender, instance, created, **kwargs):
+    # Notify websockets of AsyncJob creates, state changes and new messages or actions, coalescing repeated saves
+    cache_key = f'asyncjob_notified_state_{instance.id}'
+    if created:
+        notified = (JobState(instance.state).name, None, None)
+    else:
+        notified = (JobState(instance.state).name, *AsyncJob.objects.filter(id=instance.id).annotate(
+            last_message_id=Subquery(Message.objects.filter(async_job=OuterRef('pk'))
+                                     .order_by('-created_at').values('id')[:1]),
+            last_action_id=Subquery(AsyncAction.objects.filter(async_job=OuterRef('pk'))
+                                    .order_by('-created_at').values('id')[:1]),
+        ).values_list('last_message_id', 'last_action_id').get())
+        if cache.get(cache_key) == notified:
+            LOG.debug(f'AsyncJob {instance.id} saved without a state, message or action change, '
+                      f'skipping websocket notification.')
+            return
+    cache.set(cache_key, notified, settings.ASYNCJOB_NOTIFICATION_DEBOUNCE)
+
+    from apps.consumers import send_shipment_event
+    send_shipment_event(instance.shipment, {"type": "jobs.update", "async_job_id": instance.id})
 
 
 @receiver(post_save, sender=Message, dispatch_uid='message_post_save')
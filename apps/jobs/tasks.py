@@ -11,9 +11,9 @@ from django.conf import settings
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from influxdb_metrics.loader import log_metric
 from shipchain_common.exceptions import RPCError
 
+from apps.metrics import log_metric
 from .exceptions import WalletInUseException, TransactionCollisionException
 
 LOG = logging.getLogger('transmission')
@@ -5,9 +5,9 @@ from rest_framework import viewsets, mixins, permissions, parsers, status, rende
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_json_api import parsers as jsapi_parsers
-from influxdb_metrics.loader import log_metric
 from shipchain_common.authentication import EngineRequest
 
+from apps.metrics import log_metric
 from apps.permissions import get_owner_id
 from apps.shipments.permissions import IsListenerOwner
 from .models import AsyncJob, Message
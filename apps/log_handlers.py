@@ -0,0 +1,126 @@
+"""
+Copyright 2020 ShipChain, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import queue
+import sys
+import threading
+import traceback
+from logging.handlers import QueueHandler, QueueListener
+
+import watchtower
+
+from apps.metrics import log_metric
+
+
+class CloudWatchQueueListener(QueueListener):
+    """
+    Hands the queued records to watchtower, which batches them into PutLogEvents calls from its own sender threads.
+    Records are dropped while watchtower's backlog is at max_backlog, when CloudWatch can't keep up.
+    """
+
+    def __init__(self, log_queue, cloudwatch_kwargs, max_backlog, on_drop):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.cloudwatch_kwargs = cloudwatch_kwargs
+        self.cloudwatch_handler = None
+        self.max_backlog = max_backlog
+        self.on_drop = on_drop
+
+    def _monitor(self):
+        # Creating the handler calls CloudWatch (create_log_group), which must not happen on a logging thread.
+        # Records are dropped if it fails
+        try:
+            self.cloudwatch_handler = watchtower.CloudWatchLogHandler(use_queues=True, **self.cloudwatch_kwargs)
+            self.handlers = (self.cloudwatch_handler,)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+        super()._monitor()
+
+    def handle(self, record):
+        if not self.cloudwatch_handler or \
+                sum(stream_queue.qsize() for stream_queue in list(self.cloudwatch_handler.queues.values())) \
+                >= self.max_backlog:
+            self.on_drop()
+            return
+        super().handle(record)
+
+    def enqueue_sentinel(self):
+        # The queue is full when the handler is closed under load, the oldest records are dropped to make room
+        while True:
+            try:
+                self.queue.put_nowait(self._sentinel)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.on_drop()
+                except queue.Empty:
+                    pass
+
+    def stop(self):
+        super().stop()
+        if self.cloudwatch_handler:
+            # Ships the records queued in watchtower
+            self.cloudwatch_handler.close()
+
+
+class QueuedCloudWatchLogHandler(QueueHandler):
+    """
+    Logging handler that never waits on CloudWatch: records are formatted and put in a queue of at most
+    max_queue_size records, shipped to CloudWatch by a listener thread. Records logged while the queue is full
+    are dropped and counted in the transmission.logs_dropped metric.
+    """
+
+    def __init__(self, max_queue_size=10000, **cloudwatch_kwargs):
+        super().__init__(queue.Queue(maxsize=max_queue_size))
+        self.max_queue_size = max_queue_size
+        self.cloudwatch_kwargs = cloudwatch_kwargs
+        self.listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        # Neither the listener nor watchtower's sender threads survive the fork of gunicorn and celery workers,
+        # each process ships its logs with its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=self.max_queue_size)
+            self.listener = CloudWatchQueueListener(self.queue, self.cloudwatch_kwargs, self.max_queue_size,
+                                                    self.record_dropped)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def record_dropped(self):
+        log_metric('transmission.logs_dropped', tags={'handler': 'cloudwatch', 'module': __name__})
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.record_dropped()
+
+    def close(self):
+        with self._lock:
+            if self.listener and self._pid == os.getpid():
+                # Ships the queued records before the process exits
+                self.listener.stop()
+            self.listener = None
+            self._pid = None
+        super().close()
@@ -12,12 +12,66 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
 from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.migrations.executor import MigrationExecutor
-from django.http.response import HttpResponse
+from django.http.response import HttpResponse, JsonResponse
 from rest_framework import permissions
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 
+LOG = logging.getLogger('transmission')
+
+# Checks run here so that a hung connection can be abandoned after HEALTH_CHECK_TIMEOUT
+HEALTH_CHECK_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='health-check')
+
+
+class MigrationCheck:
+    """
+    Building the migration plan loads every migration module and queries django_migrations. Once applied,
+    migrations stay applied for the life of the process, pending ones are checked again after
+    HEALTH_MIGRATION_CHECK_TTL seconds.
+    """
+    applied = False
+    checked_at = None
+
+    @classmethod
+    def migrations_applied(cls):
+        if not cls.applied and (cls.checked_at is None or
+                                time.monotonic() - cls.checked_at >= settings.HEALTH_MIGRATION_CHECK_TTL):
+            executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+            cls.applied = not executor.migration_plan(executor.loader.graph.leaf_nodes())
+            cls.checked_at = time.monotonic()
+        return cls.applied
+
+
+def check_database():
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    finally:
+        # Connections are per thread, one left open by an executor thread would never be reused nor closed
+        connection.close()
+
+
+def check_cache():
+    cache.get('health_check')
+
+
+def check_channel_layer():
+    async def send():
+        channel_layer = get_channel_layer()
+        await channel_layer.send(await channel_layer.new_channel(), {'type': 'health.check'})
+
+    async_to_sync(send)()
+
 
 @api_view(['GET'])
 @authentication_classes(())
@@ -27,6 +81,39 @@ def health_check(request):
     This endpoint (/health) returns 200 if no migrations are pending, else 503
     https://engineering.instawork.com/elegant-database-migrations-on-ecs-74f3487da99f
     """
-    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
-    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
-    return HttpResponse(status=503 if plan else 200)
+    return HttpResponse(status=200 if MigrationCheck.migrations_applied() else 503)
+
+
+@api_view(['GET'])
+@authentication_classes(())
+@permission_classes((permissions.AllowAny,))
+def liveness_check(request):
+    """
+    This endpoint (/health/live) returns 200 as long as the process serves requests
+    """
+    return HttpResponse(status=200)
+
+
+@api_view(['GET'])
+@authentication_classes(())
+@permission_classes((permissions.AllowAny,))
+def readiness_check(request):
+    """
+    This endpoint (/health/ready) returns 200 if the database, the cache and the channel layer respond within
+    HEALTH_CHECK_TIMEOUT and no migrations are pending, else 503
+    """
+    checks = {}
+    futures = {name: HEALTH_CHECK_EXECUTOR.submit(check) for name, check in (('database', check_database),
+                                                                             ('cache', check_cache),
+                                                                             ('channel_layer', check_channel_layer))}
+    for name, future in futures.items():
+        try:
+            future.result(timeout=settings.HEALTH_CHECK_TIMEOUT)
+            checks[name] = True
+        except Exception as exc:  # pylint:disable=broad-except
+            LOG.warning(f'Readiness check of the {name} failed: {exc!r}')
+            checks[name] = False
+
+    checks['migrations'] = checks['database'] and MigrationCheck.migrations_applied()
+
+    return JsonResponse(checks, status=200 if all(checks.values()) else 503)
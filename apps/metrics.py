@@ -0,0 +1,144 @@
+"""
+Copyright 2020 ShipChain, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from influxdb import InfluxDBClient
+
+LOG = logging.getLogger('transmission')
+
+
+class MetricsBuffer:
+    """
+    In-process aggregation of the metrics logged between two flushes, written to InfluxDB in one batch by a
+    background thread every INFLUXDB_FLUSH_INTERVAL seconds.
+    Counter points, whose fields are all numeric, of the same measurement and tags are merged and their fields
+    summed. Points with other fields (addresses of a token transfer) are kept as logged, with their own time.
+    At most INFLUXDB_MAX_SERIES series and individual points are buffered, newer ones are dropped until the next flush.
+    """
+
+    def __init__(self, flush_interval, max_series):
+        self.flush_interval = flush_interval
+        self.max_series = max_series
+        self._series = {}
+        self._points = []
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._process_lock = threading.Lock()
+        self._client = None
+        self._thread = None
+        self._pid = None
+
+    def add(self, measurement, tags=None, fields=None):
+        key = (measurement, tuple(sorted((tags or {}).items())))
+        fields = fields or {'value': 1}
+
+        self._ensure_process()
+
+        aggregated = all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in fields.values())
+        point_time = None if aggregated else datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            series = self._series.get(key) if aggregated else None
+            if series is None:
+                if len(self._series) + len(self._points) >= self.max_series:
+                    self._dropped += 1
+                    return
+                if not aggregated:
+                    self._points.append((key, dict(fields), point_time))
+                    return
+                series = self._series[key] = {}
+            for field, value in fields.items():
+                series[field] = series.get(field, 0) + value
+
+    def _ensure_process(self):
+        """
+        Start the flush thread of the current process. The thread doesn't survive the fork of gunicorn and celery
+        workers, which also inherit the parent's points (flushed by the parent) and its lock, possibly held by the
+        parent's flush thread at fork time: a forked process starts with an empty buffer, a new lock and its own thread.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._process_lock:
+            if self._pid == os.getpid():
+                return
+            self._lock = threading.Lock()
+            self._series = {}
+            self._points = []
+            self._dropped = 0
+            self._client = None
+            self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def get_client(self):
+        if not self._client:
+            self._client = InfluxDBClient(settings.INFLUXDB_HOST, settings.INFLUXDB_PORT, settings.INFLUXDB_USER,
+                                          settings.INFLUXDB_PASSWORD, settings.INFLUXDB_DATABASE,
+                                          timeout=settings.INFLUXDB_TIMEOUT)
+        return self._client
+
+    def drain(self):
+        with self._lock:
+            series, self._series = self._series, {}
+            individual_points, self._points = self._points, []
+            dropped, self._dropped = self._dropped, 0
+
+        timestamp = datetime.now(timezone.utc).isoformat()
+        points = [{'measurement': measurement, 'tags': dict(tags), 'fields': fields, 'time': timestamp}
+                  for (measurement, tags), fields in series.items()]
+        points += [{'measurement': measurement, 'tags': dict(tags), 'fields': fields, 'time': point_time}
+                   for (measurement, tags), fields, point_time in individual_points]
+        if dropped:
+            points.append({'measurement': 'transmission.metrics_dropped', 'tags': {'module': __name__},
+                           'fields': {'value': dropped}, 'time': timestamp})
+        return points
+
+    def flush(self):
+        points = self.drain()
+        if not points:
+            return
+        try:
+            self.get_client().write_points(points)
+        except Exception as exc:
+            # Metrics are best effort, a failed batch is not retried
+            LOG.warning(f'Writing {len(points)} metric points to InfluxDB failed: {exc}')
+
+
+METRICS_BUFFER = MetricsBuffer(settings.INFLUXDB_FLUSH_INTERVAL, settings.INFLUXDB_MAX_SERIES)
+
+
+def log_metric(measurement, tags=None, fields=None):
+    """
+    Buffered replacement of influxdb_metrics.loader.log_metric, the calling thread never waits on InfluxDB
+    """
+    if settings.INFLUXDB_DISABLED:
+        return
+    METRICS_BUFFER.add(measurement, tags=tags, fields=fields)
+
+
+atexit.register(METRICS_BUFFER.flush)
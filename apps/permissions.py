@@ -15,18 +15,27 @@ limitations under the License.
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from django.core.cache import cache
 from django.db.models import Q
 from django.conf import settings
 
+from requests.exceptions import RequestException
 from rest_framework import permissions, status
 from shipchain_common.authentication import get_jwt_from_request
 from shipchain_common.utils import get_client_ip
 
+from apps.metrics import log_metric
 from apps.shipments.models import Shipment
+from apps.utils import invalidate_profiles_wallet_ids
 
 PROFILES_WALLET_URL = f'{settings.PROFILES_URL}/api/v1/wallet'
 
+# Profiles answers to a wallet access check that hold until the wallet or its users change
+WALLET_ACCESS_DEFINITIVE_STATUSES = (status.HTTP_200_OK, status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN,
+                                     status.HTTP_404_NOT_FOUND)
+
 LOG = logging.getLogger('transmission')
 
 
@@ -73,12 +82,50 @@ def get_requester_username(request):
     return None
 
 
-def shipment_exists(shipment_id):
+def has_wallet_access(request, wallet_id):
     """
-    Check whether a shipment_id included in a nested route exists.
-    Returns False if it isn't otherwise returns the Shipment object
+    Check with Profiles whether the requesting user has access to wallet_id.
+    Answers are memoized on the request, definitive ones are cached across requests for PROFILES_WALLET_ACCESS_TTL
+    seconds. Profiles errors deny the access for the current request only.
     """
-    return Shipment.objects.filter(id=shipment_id).count()
+    jwt = get_jwt_from_request(request)
+    if not jwt or not wallet_id:
+        return False
+
+    if not hasattr(request, 'wallet_access'):
+        request.wallet_access = {}
+    if wallet_id in request.wallet_access:
+        return request.wallet_access[wallet_id]
+
+    cache_key = f'wallet_access_{request.user.id}_{wallet_id}'
+    has_access = cache.get(cache_key) if settings.PROFILES_WALLET_ACCESS_TTL else None
+    if has_access is None:
+        response = settings.REQUESTS_SESSION.get(f'{PROFILES_WALLET_URL}/{wallet_id}/?is_active',
+                                                 headers={'Authorization': f'JWT {jwt}'})
+        has_access = response.status_code == status.HTTP_200_OK
+        if response.status_code in WALLET_ACCESS_DEFINITIVE_STATUSES:
+            if settings.PROFILES_WALLET_ACCESS_TTL:
+                cache.set(cache_key, has_access, settings.PROFILES_WALLET_ACCESS_TTL)
+            # Keeps the wallet list of shipment list filters in line with this fresher answer
+            invalidate_profiles_wallet_ids(request.user.id, wallet_id, has_access=has_access)
+        else:
+            LOG.warning(f'Profiles answered {response.status_code} to the access check of wallet {wallet_id}')
+
+    request.wallet_access[wallet_id] = has_access
+    return has_access
+
+
+def get_request_shipment(request, shipment_id):
+    """
+    Request-scoped loader for the Shipment of a nested route, shared by permissions, views and serializers.
+    Returns None if the Shipment does not exist.
+    """
+    shipment = getattr(request, 'shipment', None)
+    if shipment is None or shipment.id != shipment_id:
+        shipment = Shipment.objects.select_related('routeleg__route', 'device', 'loadshipment').filter(
+            id=shipment_id).first()
+        request.shipment = shipment
+    return shipment
 
 
 class IsOwner(permissions.BasePermission):
@@ -96,7 +143,7 @@ class ShipmentExists(permissions.BasePermission):
     def has_permission(self, request, view):
         shipment_id = view.kwargs.get('shipment_pk') or view.kwargs.get('pk')
 
-        if not shipment_exists(shipment_id):
+        if not get_request_shipment(request, shipment_id):
             # The requested views are only accessible via nested routes
             requester = f'User [{request.user.id}]' if request.user.id else f'Ip [{get_client_ip(request)}]'
             LOG.warning(f'{requester}, is trying to access a non existing shipment: [{shipment_id}]')
@@ -121,13 +168,8 @@ class IsShipperMixin:
     """
 
     @staticmethod
-    def has_shipper_permission(jwt, shipment):
-        if not jwt:
-            return False
-        response = settings.REQUESTS_SESSION.get(f'{PROFILES_WALLET_URL}/{shipment.shipper_wallet_id}/?is_active',
-                                                 headers={'Authorization': f'JWT {jwt}'})
-
-        return response.status_code == status.HTTP_200_OK
+    def has_shipper_permission(request, shipment):
+        return has_wallet_access(request, shipment.shipper_wallet_id)
 
 
 class IsCarrierMixin:
@@ -136,13 +178,8 @@ class IsCarrierMixin:
     """
 
     @staticmethod
-    def has_carrier_permission(jwt, shipment):
-        if not jwt:
-            return False
-        response = settings.REQUESTS_SESSION.get(f'{PROFILES_WALLET_URL}/{shipment.carrier_wallet_id}/?is_active',
-                                                 headers={'Authorization': f'JWT {jwt}'})
-
-        return response.status_code == status.HTTP_200_OK
+    def has_carrier_permission(request, shipment):
+        return has_wallet_access(request, shipment.carrier_wallet_id)
 
 
 class IsModeratorMixin:
@@ -151,12 +188,46 @@ class IsModeratorMixin:
     """
 
     @staticmethod
-    def has_moderator_permission(jwt, shipment):
-        if jwt and shipment.moderator_wallet_id:
-            response = settings.REQUESTS_SESSION.get(f'{PROFILES_WALLET_URL}/{shipment.moderator_wallet_id}/?is_active',
-                                                     headers={'Authorization': f'JWT {jwt}'})
+    def has_moderator_permission(request, shipment):
+        return has_wallet_access(request, shipment.moderator_wallet_id)
+
+
+class IsShipperCarrierModeratorMixin(IsShipperMixin, IsCarrierMixin, IsModeratorMixin):
+    """
+    Shipper, Carrier or Moderator shipment access, resolved with up to PROFILES_PERMISSION_WORKERS concurrent
+    requests to Profiles
+    """
+
+    def has_wallet_permission(self, request, shipment):
+        checks = (self.has_shipper_permission, self.has_carrier_permission, self.has_moderator_permission)
+        if not get_jwt_from_request(request):
+            return False
 
-            return response.status_code == status.HTTP_200_OK
+        if settings.PROFILES_PERMISSION_WORKERS <= 1:
+            return any(check(request, shipment) for check in checks)
+
+        # A pool per request, requests don't queue behind the Profiles calls of each other
+        executor = ThreadPoolExecutor(max_workers=min(settings.PROFILES_PERMISSION_WORKERS, len(checks)),
+                                      thread_name_prefix='profiles-permission')
+        futures = [executor.submit(check, request, shipment) for check in checks]
+        error = None
+        try:
+            for future in as_completed(futures):
+                try:
+                    if future.result():
+                        # Granted as soon as any of the checks succeeds, the remaining ones finish in the background
+                        return True
+                except RequestException as exc:
+                    error = error or exc
+        finally:
+            executor.shutdown(wait=False)
+
+        if error:
+            # No wallet granted access and Profiles failed to answer for one, the error surfaces as on the serial path
+            LOG.error(f'Error communicating with Profiles during permission check: {error}')
+            log_metric('transmission.error', tags={'method': 'permissions.has_wallet_permission',
+                                                   'module': __name__})
+            raise error
         return False
 
 
@@ -166,15 +237,13 @@ class IsNestedOwner(IsShipmentOwnerMixin, permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        shipment = Shipment.objects.get(id=view.kwargs.get('shipment_pk'))
+        shipment = get_request_shipment(request, view.kwargs.get('shipment_pk'))
 
-        return self.is_shipment_owner(request, shipment)
+        return shipment is not None and self.is_shipment_owner(request, shipment)
 
 
 class IsNestedOwnerShipperCarrierModerator(IsShipmentOwnerMixin,
-                                           IsCarrierMixin,
-                                           IsModeratorMixin,
-                                           IsShipperMixin,
+                                           IsShipperCarrierModeratorMixin,
                                            permissions.BasePermission):
     """
     Custom permission to only allow owner, shipper, moderator and carrier
@@ -195,10 +264,7 @@ class IsNestedOwnerShipperCarrierModerator(IsShipmentOwnerMixin,
     """
 
     def has_permission(self, request, view):
-        shipment = Shipment.objects.get(id=view.kwargs.get('shipment_pk'))
-        jwt = get_jwt_from_request(request)
+        shipment = get_request_shipment(request, view.kwargs.get('shipment_pk'))
 
-        return self.is_shipment_owner(request, shipment) or \
-            self.has_shipper_permission(jwt, shipment) or \
-            self.has_carrier_permission(jwt, shipment) or \
-            self.has_moderator_permission(jwt, shipment)
+        return shipment is not None and (self.is_shipment_owner(request, shipment) or
+                                         self.has_wallet_permission(request, shipment))
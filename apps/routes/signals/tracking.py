@@ -1,7 +1,5 @@
 import logging
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.contrib.gis.geos import Point
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
@@ -13,8 +11,6 @@ from apps.shipments.models import TransitState
 
 LOG = logging.getLogger('transmission')
 
-channel_layer = get_channel_layer()  # pylint:disable=invalid-name
-
 
 @receiver(pre_save, sender=RouteTrackingData, dispatch_uid='routetrackingdata_pre_save')
 def routetrackingdata_pre_save(sender, **kwargs):
@@ -27,11 +23,24 @@ def routetrackingdata_post_save(sender, **kwargs):
     instance = kwargs["instance"]
     LOG.debug(f'New tracking_data committed to db and will be pushed to the UI. Tracking_data: {instance.id}.')
 
+    legs = list(instance.route.routeleg_set.filter(
+        shipment__state=TransitState.IN_TRANSIT.value).select_related('shipment'))
+    if not legs:
+        return
+
+    # The frame is the same for every shipment in Route, only the shipment id differs
+    from apps.consumers import AppsConsumer, send_shipment_event
+    from apps.shipments.geojson import render_point_feature
+    geojson = render_point_feature(RouteTrackingData.objects.filter(id=instance.id))
+
     # Invalidate cached tracking data view for each shipment in Route
-    for leg in instance.route.routeleg_set.filter(shipment__state=TransitState.IN_TRANSIT.value):
+    for leg in legs:
         tracking_get_url = reverse('shipment-tracking', kwargs={'version': 'v1', 'pk': leg.shipment.id})
         list(find_urls([tracking_get_url + "*"], purge=True))
 
         # Notify websocket channel
-        async_to_sync(channel_layer.group_send)(leg.shipment.owner_id,
-                                                {"type": "tracking_data.save", "tracking_data_id": instance.id})
+        send_shipment_event(leg.shipment, {
+            "type": "tracking_data.save",
+            "tracking_data_id": instance.id,
+            "tracking_data_json": AppsConsumer.render_async_tracking_data(leg.shipment.id, geojson),
+        })
@@ -13,10 +13,14 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.fields.jsonb import KeyTransform
 from django.forms.fields import MultipleChoiceField
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 from rest_framework_json_api.serializers import ValidationError
 from shipchain_common.filters import filter_enum
+from shipchain_common.utils import parse_value
 
 from apps.routes.models import RouteTelemetryData
 from apps.shipments.models import Shipment, TransitState, TelemetryData, TrackingData
@@ -44,6 +48,34 @@ def filter_state(queryset, _, value):
     return queryset
 
 
+def filter_customer_fields(queryset, query_params, prefix=''):
+    """
+    Apply `customer_fields__<key>=<value>` query params. Equality on a key path is rewritten to a containment (@>)
+    filter served by the jsonb_path_ops index. Explicit lookups, array indexes, nulls and array/object values keep
+    the key transform lookup, as containment is not equivalent for them.
+    """
+    field_prefix = f'{prefix}customer_fields__'
+    lookups = {*JSONField.get_lookups(), *KeyTransform.get_lookups()}
+
+    for key, value in query_params.items():
+        if not key.startswith(field_prefix):
+            continue
+
+        value = parse_value(value)
+        path = key[len(field_prefix):].split('__')
+
+        if path[-1] in lookups or any(segment.isdigit() for segment in path) or \
+                value is None or isinstance(value, (list, dict)):
+            queryset = queryset.filter(**{key: value})
+            continue
+
+        for segment in reversed(path):
+            value = {segment: value}
+        queryset = queryset.filter(**{f'{prefix}customer_fields__contains': value})
+
+    return queryset
+
+
 class CaseInsensitiveMultipleChoiceField(MultipleChoiceField):
     def valid_value(self, value):
         value = value.upper()
@@ -162,6 +194,21 @@ SHIPMENT_SEARCH_FIELDS = (
     'pk'
 )
 
+
+class ShipmentSearchFilter(SearchFilter):
+    """
+    Serves `search` from the trigram indexed ShipmentSearchDocument instead of an icontains across every
+    SHIPMENT_SEARCH_FIELDS join. Views over a Shipment relation set `search_document_prefix`, e.g. 'shipment__'.
+    """
+    def filter_queryset(self, request, queryset, view):
+        lookup = f'{getattr(view, "search_document_prefix", "")}search_document__document__contains'
+
+        for search_term in self.get_search_terms(request):
+            queryset = queryset.filter(**{lookup: search_term.lower()})
+
+        return queryset
+
+
 SHIPMENT_ORDERING_FIELDS = (
     'updated_at',
     'created_at',
@@ -4,8 +4,8 @@ import logging
 from django.core.serializers.base import SerializationError
 from django.contrib.gis.serializers.geojson import Serializer as GeoSerializer
 from django.db.models.query import QuerySet
-from influxdb_metrics.loader import log_metric
 
+from apps.metrics import log_metric
 from apps.utils import AliasSerializerMixin
 from .models import TrackingData
 
@@ -16,11 +16,12 @@ limitations under the License.
 
 import logging
 
-from influxdb_metrics.loader import log_metric
 from shipchain_common.aws import URLShortenerClient
 from shipchain_common.exceptions import AWSIoTError, URLShortenerError
 from shipchain_common.iot import AWSIoTClient
 
+from apps.metrics import log_metric
+
 LOG = logging.getLogger('transmission')
 
 
@@ -0,0 +1,107 @@
+# Generated by Django 3.0.8 on 2020-11-02 15:20
+
+import json
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# SHIPMENT_SEARCH_FIELDS at the time of this migration, later changes are applied by their own migrations
+SEARCH_FIELDS = (
+    'shippers_reference',
+    'forwarders_reference',
+    'ship_from_location__name',
+    'ship_from_location__city',
+    'ship_from_location__address_1',
+    'ship_from_location__postal_code',
+    'ship_from_location__country',
+    'ship_from_location__state',
+    'ship_from_location__contact_name',
+    'ship_from_location__contact_email',
+    'ship_to_location__name',
+    'ship_to_location__city',
+    'ship_to_location__address_1',
+    'ship_to_location__postal_code',
+    'ship_to_location__country',
+    'ship_to_location__state',
+    'ship_to_location__contact_name',
+    'ship_to_location__contact_email',
+    'final_destination_location__name',
+    'final_destination_location__city',
+    'final_destination_location__address_1',
+    'final_destination_location__postal_code',
+    'final_destination_location__country',
+    'final_destination_location__state',
+    'final_destination_location__contact_name',
+    'final_destination_location__contact_email',
+    'shipment_tags__tag_type',
+    'shipment_tags__tag_value',
+    'quickadd_tracking',
+    'customer_fields',
+    'pk'
+)
+
+
+def search_values(obj, path):
+    attribute, _, remainder = path.partition('__')
+    value = getattr(obj, attribute, None)
+
+    if value is None:
+        return []
+
+    if isinstance(value, models.Manager):
+        return [item for related in value.all() for item in search_values(related, remainder)]
+
+    if remainder:
+        return search_values(value, remainder)
+
+    if isinstance(value, (dict, list)):
+        return [json.dumps(value, ensure_ascii=False)]
+
+    return [str(value)]
+
+
+def build_search_documents(apps, schema_editor):
+    Shipment = apps.get_model('shipments', 'Shipment')
+    ShipmentSearchDocument = apps.get_model('shipments', 'ShipmentSearchDocument')
+
+    batch_size = 1000
+    queryset = Shipment.objects.select_related(
+        'ship_from_location', 'ship_to_location', 'final_destination_location'
+    ).prefetch_related('shipment_tags').order_by('pk')
+
+    for offset in range(0, queryset.count(), batch_size):
+        ShipmentSearchDocument.objects.bulk_create([
+            ShipmentSearchDocument(
+                shipment_id=shipment.id,
+                document='\n'.join(
+                    value for path in SEARCH_FIELDS for value in search_values(shipment, path)
+                ).lower()
+            )
+            for shipment in queryset[offset:offset + batch_size]
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0001_squashed_0021_rename_aftership_tracking'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='ShipmentSearchDocument',
+            fields=[
+                ('shipment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='shipments.Shipment')),
+                ('document', models.TextField(default='')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='shipmentsearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['document'], name='shipment_search_document_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
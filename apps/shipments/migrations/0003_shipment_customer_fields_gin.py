@@ -0,0 +1,18 @@
+# Generated by Django 3.0.8 on 2020-11-04 10:02
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0002_shipmentsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shipment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['customer_fields'], name='shipment_customer_fields_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
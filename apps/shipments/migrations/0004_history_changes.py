@@ -0,0 +1,24 @@
+# Generated by Django 3.0.8 on 2020-11-06 14:41
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0003_shipment_customer_fields_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicallocation',
+            name='history_changes',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalshipment',
+            name='history_changes',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
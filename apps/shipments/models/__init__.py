@@ -4,6 +4,7 @@ from .shipment import Shipment, LoadShipment, FundingType, ShipmentState, Transi
     GTXValidation
 from .permission_link import PermissionLink
 from .tags import ShipmentTag
+from .search_document import ShipmentSearchDocument
 from .tracking_data import TrackingData
 from .telemetry_data import TelemetryData
 from .note import ShipmentNote
@@ -71,6 +71,20 @@ class AccessRequest(models.Model):
     class Meta:
         ordering = ('created_at',)
 
+    @staticmethod
+    def requester_permissions(request):
+        """
+        The requesting user's AccessRequest permission map, loaded once per request
+        """
+        if not hasattr(request, 'access_request_permissions'):
+            request.access_request_permissions = getattr(request.user, 'access_request_permissions', {})
+        return request.access_request_permissions
+
+    @staticmethod
+    def has_requester_permission(request, shipment_id, endpoint, permission_level):
+        levels = AccessRequest.requester_permissions(request).get(shipment_id, {})
+        return levels.get(endpoint.name, PermissionLevel.NONE).value >= permission_level.value
+
     # Permission class factory
     @staticmethod
     def permission(endpoint, permission_level):
@@ -87,23 +101,14 @@ class AccessRequest(models.Model):
                         nested_shipment = shipment.id
 
                 if nested_shipment:
-                    filters = {
-                        'id': nested_shipment,
-                        'accessrequest__requester_id': request.user.id,
-                        f'accessrequest__{endpoint.name}_permission__gte': self.required_permission_level,
-                        'accessrequest__approved': True,
-                    }
-                    return Shipment.objects.filter(**filters).exists()
+                    return AccessRequest.has_requester_permission(
+                        request, nested_shipment, endpoint, self.required_permission_level)
                 return True
 
             def has_object_permission(self, request, view, obj):
                 shipment = obj.shipment if hasattr(obj, 'shipment') else obj
-                filters = {
-                    'requester_id': request.user.id,
-                    f'{endpoint.name}_permission__gte': self.required_permission_level,
-                    'approved': True,
-                }
-                return shipment.accessrequest_set.filter(**filters).exists()
+                return AccessRequest.has_requester_permission(
+                    request, shipment.id, endpoint, self.required_permission_level)
 
         return AccessRequestPermission
 
@@ -113,13 +118,9 @@ class AccessRequest(models.Model):
             required_permission_level = permission_level
 
             def has_object_permission(self, request, obj):
-                if obj.id in getattr(request.user, 'access_request_shipments', []):
-                    filters = {
-                        'requester_id': request.user.id,
-                        f'{endpoint.name}_permission__gte': self.required_permission_level,
-                        'approved': True,
-                    }
-                    return obj.accessrequest_set.filter(**filters).exists()
+                if obj.id in AccessRequest.requester_permissions(request):
+                    return AccessRequest.has_requester_permission(
+                        request, obj.id, endpoint, self.required_permission_level)
 
                 # Access wasn't granted to this Shipment by an AccessRequest
                 return True
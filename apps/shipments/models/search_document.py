@@ -0,0 +1,78 @@
+"""
+Copyright 2020 ShipChain, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+
+from .shipment import Shipment
+
+
+def _search_values(obj, path):
+    attribute, _, remainder = path.partition('__')
+    value = getattr(obj, attribute, None)
+
+    if value is None:
+        return []
+
+    if isinstance(value, models.Manager):
+        return [item for related in value.all() for item in _search_values(related, remainder)]
+
+    if remainder:
+        return _search_values(value, remainder)
+
+    if isinstance(value, (dict, list)):
+        # Matches the text representation of the jsonb column searched by icontains
+        return [json.dumps(value, ensure_ascii=False)]
+
+    return [str(value)]
+
+
+def build_search_document(shipment):
+    """
+    Lowercased values of every SHIPMENT_SEARCH_FIELDS path, one per line.
+    Search terms never contain whitespace, so a term can only match within a single value.
+    """
+    from ..filters import SHIPMENT_SEARCH_FIELDS
+
+    values = [value for path in SHIPMENT_SEARCH_FIELDS for value in _search_values(shipment, path)]
+    return '\n'.join(values).lower()
+
+
+class ShipmentSearchDocument(models.Model):
+    shipment = models.OneToOneField(Shipment, primary_key=True, on_delete=models.CASCADE,
+                                    related_name='search_document')
+    document = models.TextField(default='')
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['document'], name='shipment_search_document_trgm', opclasses=['gin_trgm_ops']),
+        ]
+
+    @staticmethod
+    def refresh(shipment_id, create=True):
+        shipment = Shipment.objects.select_related(
+            'ship_from_location', 'ship_to_location', 'final_destination_location'
+        ).prefetch_related('shipment_tags').filter(id=shipment_id).first()
+
+        if not shipment:
+            return
+
+        document = build_search_document(shipment)
+        if create:
+            ShipmentSearchDocument.objects.update_or_create(shipment_id=shipment_id, defaults={'document': document})
+        else:
+            ShipmentSearchDocument.objects.filter(shipment_id=shipment_id).update(document=document)
@@ -25,17 +25,18 @@ import requests
 import pytz
 from django.conf import settings
 from django.contrib.postgres.fields import JSONField, ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import RegexValidator, MinValueValidator
 from django.db import models
 from django_fsm import FSMIntegerField, transition
 from enumfields import Enum, EnumIntegerField
 from enumfields import EnumField
-from influxdb_metrics.loader import log_metric
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from shipchain_common.utils import random_id
 
 from apps.eth.fields import AddressField, HashField
 from apps.jobs.models import AsyncJob, JobState
+from apps.metrics import log_metric
 from apps.shipments.models import Device, Location
 from apps.simple_history import TxmHistoricalRecords, AnonymousHistoricalMixin
 from ..rpc import RPCClientFactory
@@ -134,6 +135,10 @@ class Shipment(AnonymousHistoricalMixin, models.Model):
 
     class Meta:
         ordering = ('created_at',)
+        indexes = [
+            # Serves customer_fields containment (@>) filters
+            GinIndex(fields=['customer_fields'], name='shipment_customer_fields_gin', opclasses=['jsonb_path_ops']),
+        ]
 
     # Protected Fields
     state = FSMIntegerField(default=TransitState.AWAITING_PICKUP.value, protected=True, db_index=True)
@@ -15,9 +15,8 @@ limitations under the License.
 """
 from django.db.models import Q
 from rest_framework import permissions
-from shipchain_common.authentication import get_jwt_from_request
 
-from apps.permissions import IsShipmentOwnerMixin, IsShipperMixin, IsModeratorMixin, IsCarrierMixin
+from apps.permissions import IsShipmentOwnerMixin, IsShipperCarrierModeratorMixin, get_request_shipment
 from .models import Shipment, PermissionLink
 from ..utils import retrieve_profiles_wallet_ids
 
@@ -48,9 +47,7 @@ class IsAuthenticatedOrDevice(permissions.IsAuthenticated):
 
 
 class IsOwnerOrShared(IsShipmentOwnerMixin,
-                      IsShipperMixin,
-                      IsCarrierMixin,
-                      IsModeratorMixin,
+                      IsShipperCarrierModeratorMixin,
                       IsSharedShipmentMixin,
                       permissions.IsAuthenticated):
     def has_permission(self, request, view):
@@ -67,8 +64,8 @@ class IsOwnerOrShared(IsShipmentOwnerMixin,
         if nested_shipment:
             # Nested routes do not call has_object_permission for the parent Shipment,
             # so we must check object permissions here
-            shipment = Shipment.objects.get(id=nested_shipment)
-            return self.has_object_permission(request, view, shipment)
+            shipment = get_request_shipment(request, nested_shipment)
+            return shipment is not None and self.has_object_permission(request, view, shipment)
 
         if nested_device:
             # Nested device routes need to be ensured that they have a shipment associated with the device
@@ -79,18 +76,13 @@ class IsOwnerOrShared(IsShipmentOwnerMixin,
         return is_authenticated or has_permission_link
 
     def has_object_permission(self, request, view, obj):
-        jwt = get_jwt_from_request(request)
         return (self.is_shipment_owner(request, obj) or
                 self.has_valid_permission_link(request, obj) or
-                self.has_shipper_permission(jwt, obj) or
-                self.has_carrier_permission(jwt, obj) or
-                self.has_moderator_permission(jwt, obj))
+                self.has_wallet_permission(request, obj))
 
 
 class IsOwnerShipperCarrierModerator(IsShipmentOwnerMixin,
-                                     IsShipperMixin,
-                                     IsCarrierMixin,
-                                     IsModeratorMixin,
+                                     IsShipperCarrierModeratorMixin,
                                      permissions.IsAuthenticated):
     """
     Custom permission to allow only Owners, Shipper, Carrier and Moderator
@@ -108,18 +100,14 @@ class IsOwnerShipperCarrierModerator(IsShipmentOwnerMixin,
         if nested_shipment:
             # Nested routes do not call has_object_permission for the parent Shipment,
             # so we must check object permissions here
-            shipment = Shipment.objects.get(id=view.kwargs.get('shipment_pk'))
-            return self.has_object_permission(request, view, shipment)
+            shipment = get_request_shipment(request, nested_shipment)
+            return shipment is not None and self.has_object_permission(request, view, shipment)
 
         # Not nested, has_object_permission will handle permission checks
         return is_authenticated
 
     def has_object_permission(self, request, view, obj):
-        jwt = get_jwt_from_request(request)
-        return self.is_shipment_owner(request, obj) or \
-            self.has_shipper_permission(jwt, obj) or \
-            self.has_carrier_permission(jwt, obj) or \
-            self.has_moderator_permission(jwt, obj)
+        return self.is_shipment_owner(request, obj) or self.has_wallet_permission(request, obj)
 
 
 class IsListenerOwner(IsOwnerOrShared):
@@ -136,14 +124,16 @@ class IsListenerOwner(IsOwnerOrShared):
 class IsNotShipmentOwner(IsShipmentOwnerMixin, permissions.IsAuthenticated):
     def has_permission(self, request, view):
         # If nested route, we need to call has_object_permission on the Shipment
-        shipment = Shipment.objects.get(id=view.kwargs.get('shipment_pk'))
-        return super().has_permission(request, view) and not self.is_shipment_owner(request, shipment)
+        shipment = get_request_shipment(request, view.kwargs.get('shipment_pk'))
+        return (super().has_permission(request, view) and shipment is not None and
+                not self.is_shipment_owner(request, shipment))
 
 
 class IsShipmentOwner(IsShipmentOwnerMixin, permissions.IsAuthenticated):
     def has_permission(self, request, view):
-        shipment = Shipment.objects.get(id=view.kwargs.get('shipment_pk'))
-        return super().has_permission(request, view) and self.is_shipment_owner(request, shipment)
+        shipment = get_request_shipment(request, view.kwargs.get('shipment_pk'))
+        return (super().has_permission(request, view) and shipment is not None and
+                self.is_shipment_owner(request, shipment))
 
 
 class IsRequester(permissions.IsAuthenticated):
@@ -152,9 +142,10 @@ class IsRequester(permissions.IsAuthenticated):
 
 
 def shipment_list_wallets_filter(request, nested=False):
-    wallet_ids = retrieve_profiles_wallet_ids(request)
+    wallet_ids = list(retrieve_profiles_wallet_ids(request))
     queries = Q()
     for field in ('carrier', 'shipper', 'moderator'):
-        queries |= Q(**{f'{"shipment__" if nested else ""}{field}_wallet_id__in': wallet_ids})
+        # Wallet ids are sent as one array parameter rather than expanded into an IN list per field
+        queries |= Q(**{f'{"shipment__" if nested else ""}{field}_wallet_id__any': wallet_ids})
 
     return queries
@@ -3,10 +3,11 @@ import logging
 from abc import abstractmethod
 from django.conf import settings
 from django.core.cache import cache
-from influxdb_metrics.loader import log_metric
 from shipchain_common.exceptions import RPCError
 from shipchain_common.rpc import RPCClient
 
+from apps.metrics import log_metric
+
 LOG = logging.getLogger('transmission')
 
 
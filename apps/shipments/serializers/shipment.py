@@ -32,7 +32,7 @@ from rest_framework_serializer_field_permissions.serializers import FieldPermiss
 from shipchain_common.authentication import get_jwt_from_request
 from shipchain_common.utils import UpperEnumField, validate_uuid4
 
-from apps.utils import PermissionResourceRelatedField
+from apps.utils import PermissionResourceRelatedField, invalidate_profiles_wallet_ids
 from ..models import Shipment, Device, Location, LoadShipment, FundingType, EscrowState, ShipmentState, \
     ExceptionType, TransitState, GTXValidation, ShipmentTag, AccessRequest, Endpoints, PermissionLevel
 from .tags import ShipmentTagSerializer
@@ -186,7 +186,7 @@ class ShipmentSerializer(FieldPermissionSerializerMixin, EnumSupportSerializerMi
 
     def get_permission_derivation(self, obj):
         if ('request' in self.context and
-                obj.id in getattr(self.context['request'].user, 'access_request_shipments', [])):
+                obj.id in AccessRequest.requester_permissions(self.context['request'])):
             return 'AccessRequest'
         return 'OwnerOrPartyOrPermissionLink'
 
@@ -254,6 +254,10 @@ class ShipmentCreateSerializer(ShipmentSerializer):
             response = settings.REQUESTS_SESSION.get(f'{settings.PROFILES_URL}/api/v1/wallet/{shipper_wallet_id}/',
                                                      headers={'Authorization': 'JWT {}'.format(self.auth)})
 
+            # A cached wallet list disagreeing with Profiles about this wallet is stale
+            invalidate_profiles_wallet_ids(self.user.id, shipper_wallet_id,
+                                           has_access=response.status_code == status.HTTP_200_OK)
+
             if response.status_code != status.HTTP_200_OK:
                 raise serializers.ValidationError('User does not have access to this wallet in ShipChain Profiles')
 
@@ -400,7 +404,7 @@ class ShipmentTxSerializer(FieldPermissionSerializerMixin, serializers.ModelSeri
 
     def get_permission_derivation(self, obj):
         if ('request' in self.context and
-                obj.id in getattr(self.context['request'].user, 'access_request_shipments', [])):
+                obj.id in AccessRequest.requester_permissions(self.context['request'])):
             return 'AccessRequest'
         return 'OwnerOrPartyOrPermissionLink'
 
@@ -443,7 +447,7 @@ class ShipmentOverviewSerializer(serializers.ModelSerializer):
 
     def get_permission_derivation(self, obj):
         if ('request' in self.context and
-                obj.id in getattr(self.context['request'].user, 'access_request_shipments', [])):
+                obj.id in AccessRequest.requester_permissions(self.context['request'])):
             return 'AccessRequest'
         return 'OwnerOrPartyOrPermissionLink'
 
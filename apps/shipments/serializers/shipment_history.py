@@ -14,6 +14,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+from collections import defaultdict
 from datetime import timedelta
 from functools import lru_cache
 from itertools import chain
@@ -47,17 +48,20 @@ class ChangesDiffSerializer:
         self.queryset = queryset
         self.request = request
         self.shipment_id = shipment_id
+        # Historical relations of the page being serialized and the predecessors of those without persisted changes
+        self.historical_relations = {}
+        self.relation_prev_records = {}
 
-    def diff_object_fields(self, old, new):
+    def diff_object_fields(self, new):
 
         if isinstance(new, self._many_to_one_historical_models):
             return self.build_many_to_one_changes(new, new.instance._meta.model_name + 's')
 
-        changes = new.diff(old)
+        changes = new.changes()
 
         flat_changes = self.build_list_changes(changes)
         relation_changes = self.relation_changes(new)
-        flat_changes.extend(self.json_field_changes(new, old))
+        flat_changes.extend(self.json_field_changes(new))
 
         return {
             'history_date': new.history_date,
@@ -92,8 +96,10 @@ class ChangesDiffSerializer:
 
             if change.field in self.relation_fields:
                 if change.old is None:
-                    # The relationship object is created
-                    field['new'] = Location.history.filter(pk=change.new).first().instance.id
+                    # The relationship object is created, change.new is the serialized history_id
+                    historical_relation = self.historical_relations.get(str(change.new)) or \
+                        Location.history.filter(pk=change.new).first()
+                    field['new'] = historical_relation.instance.id
                 elif change.old and change.new:
                     # The relationship object has been modified no need to include it in flat changes
                     continue
@@ -112,16 +118,54 @@ class ChangesDiffSerializer:
                 if new_historical.history_user == historical_relation.history_user and \
                         date_min <= historical_relation.history_date <= date_max:
                     # The relationship field has changed
-                    changes = historical_relation.diff(historical_relation.prev_record)
+                    changes = self.relation_history_changes(historical_relation)
             if changes:
                 relations_map[relation] = self.build_list_changes(changes)
 
         return relations_map
 
-    def json_field_changes(self, new_obj, old_obj):
+    def relation_history_changes(self, historical_relation):
+        if historical_relation.history_id in self.relation_prev_records:
+            return historical_relation.diff(self.relation_prev_records[historical_relation.history_id])
+        return historical_relation.changes()
+
+    def prefetch_relation_history(self, historical_objects):
+        """
+        Map the historical relations joined to the page records by history_id and load, in one query,
+        the previous records of those created before their changes were persisted.
+        The map is keyed by the string history_id, the form it has in serialized changes.
+        """
+        self.historical_relations = {}
+        for historical_obj in historical_objects:
+            if isinstance(historical_obj, self._many_to_one_historical_models):
+                continue
+            for relation in self.relation_fields:
+                historical_relation = getattr(historical_obj, relation, None)
+                if isinstance(historical_relation, Location.history.model):
+                    self.historical_relations[str(historical_relation.history_id)] = historical_relation
+
+        legacy_relations = [historical_relation for historical_relation in self.historical_relations.values()
+                            if historical_relation.history_changes is None]
+        self.relation_prev_records = {}
+        if not legacy_relations:
+            return
+
+        location_history = defaultdict(list)
+        for historical_location in Location.history.filter(
+                id__in={historical_relation.id for historical_relation in legacy_relations},
+                history_date__lt=max(historical_relation.history_date for historical_relation in legacy_relations)
+        ).order_by('-history_date', '-history_id'):
+            location_history[historical_location.id].append(historical_location)
+
+        for historical_relation in legacy_relations:
+            self.relation_prev_records[historical_relation.history_id] = next(
+                (historical_location for historical_location in location_history[historical_relation.id]
+                 if historical_location.history_date < historical_relation.history_date), None)
+
+    def json_field_changes(self, new_obj):
         changes_list = []
-        # JsonFields changes between the two historical objects
-        json_fields_changes = new_obj.diff(old_obj, json_fields_only=True)
+        # JsonFields changes from the previous historical object
+        json_fields_changes = new_obj.changes(json_fields_only=True)
         if json_fields_changes:
             for field_name, changes in json_fields_changes.items():
                 changes_list.extend(self.build_list_changes(changes, json_field=True, base_field=field_name))
@@ -134,7 +178,7 @@ class ChangesDiffSerializer:
             'relationships': {
                 relation_object_name: {
                     'id': historical_document.id,
-                    'fields': self.build_list_changes(historical_document.diff(historical_document.prev_record))
+                    'fields': self.build_list_changes(historical_document.changes())
                 }
             },
             'author': historical_document.history_user
@@ -143,14 +187,16 @@ class ChangesDiffSerializer:
     @property
     @lru_cache()
     def historical_queryset(self):
+        """
+        Date filtered (history_id, history_date) keys of the Shipment and Document history, merged in the database
+        """
         historical_document_queryset = Document.history.filter(shipment__id=self.shipment_id,
                                                                upload_status=UploadStatus.COMPLETE)
 
-        historical_queryset = list(chain(historical_document_queryset, self.queryset))
+        keys = [self.filter_queryset(queryset).order_by().values_list('history_id', 'history_date')
+                for queryset in (historical_document_queryset, self.queryset)]
 
-        historical_queryset.sort(key=lambda historical_object: historical_object.history_date, reverse=True)
-
-        return historical_queryset
+        return keys[0].union(keys[1], all=True).order_by('-history_date', '-history_id')
 
     def filter_queryset(self, historical_queryset):
         gte_datetime = self.request.query_params.get('history_date__gte')
@@ -158,18 +204,24 @@ class ChangesDiffSerializer:
 
         if lte_datetime:
             lte_datetime = parse(lte_datetime).astimezone(pytz.utc)
-            historical_queryset = list(filter(lambda h_obj: h_obj.history_date <= lte_datetime, historical_queryset))
+            historical_queryset = historical_queryset.filter(history_date__lte=lte_datetime)
 
         if gte_datetime:
             gte_datetime = parse(gte_datetime).astimezone(pytz.utc)
-            historical_queryset = list(filter(lambda h_obj: h_obj.history_date >= gte_datetime, historical_queryset))
+            historical_queryset = historical_queryset.filter(history_date__gte=gte_datetime)
 
         return historical_queryset
 
     def get_data(self, page):
-        diff_changes = []
-
-        for historical_obj in page:
-            diff_changes.append(self.diff_object_fields(historical_obj.prev_record, historical_obj))
+        """
+        Load the historical records of a page of historical_queryset keys and build their changes
+        """
+        history_ids = [history_id for history_id, _ in page]
+        historical_objects = {
+            historical_obj.history_id: historical_obj
+            for historical_obj in chain(self.queryset.filter(history_id__in=history_ids),
+                                        Document.history.filter(history_id__in=history_ids))
+        }
+        self.prefetch_relation_history(historical_objects.values())
 
-        return diff_changes
+        return [self.diff_object_fields(historical_objects[history_id]) for history_id in history_ids]
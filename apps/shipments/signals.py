@@ -1,16 +1,14 @@
 import logging
 
 import requests
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.core.cache import cache
+from django.db.models import Q
 from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from fancy_cache.memory import find_urls
 from fieldsignals import post_save_changed
-from influxdb_metrics.loader import log_metric
 from rest_framework.exceptions import ValidationError
 from rest_framework.reverse import reverse
 from shipchain_common.exceptions import AWSIoTError
@@ -19,17 +17,18 @@ from apps.eth.models import TransactionReceipt
 from apps.eth.signals import event_update
 from apps.jobs.models import JobState, MessageType, AsyncJob, AsyncActionType
 from apps.jobs.signals import job_update
+from apps.metrics import log_metric
 from apps.sns import SNSClient
 from .events import LoadEventHandler
 from .iot_client import DeviceAWSIoTClient
-from .models import Shipment, LoadShipment, TrackingData, TransitState, TelemetryData, AccessRequest
+from .filters import SHIPMENT_SEARCH_FIELDS
+from .models import Shipment, LoadShipment, TrackingData, TransitState, TelemetryData, AccessRequest, Location, \
+    ShipmentTag, ShipmentSearchDocument
 from .rpc import RPCClientFactory
 from .serializers import ShipmentVaultSerializer
 
 LOG = logging.getLogger('transmission')
 
-channel_layer = get_channel_layer()  # pylint:disable=invalid-name
-
 
 @receiver(job_update, sender=Shipment, dispatch_uid='shipment_job_update')
 def shipment_job_update(sender, message, shipment, **kwargs):
@@ -83,6 +82,8 @@ def shipment_post_save(sender, **kwargs):
             Shipment.device.field: (None, instance.device_id),
             Shipment.state.field: (None, instance.state)
         })
+
+        shipment_search_fields_changed(Shipment, instance, {})
     else:
         # Update Shipment vault data
         rpc_client = RPCClientFactory.get_client()
@@ -92,7 +93,8 @@ def shipment_post_save(sender, **kwargs):
         # Update LOAD contract with vault uri/hash
         instance.set_vault_hash(signature['hash'], action_type=AsyncActionType.SHIPMENT)
 
-        async_to_sync(channel_layer.group_send)(instance.owner_id, {
+        from apps.consumers import send_shipment_event
+        send_shipment_event(instance, {
             "type": "shipments.update",
             "shipment_id": instance.id
         })
@@ -123,7 +125,7 @@ def loadshipment_post_save(sender, **kwargs):
 def accessrequest_post_save(sender, **kwargs):
     instance = kwargs["instance"]
     # Clear cached accessrequests for user
-    cache.delete(f'access_request_shipments_{instance.requester_id}')
+    cache.delete(f'access_request_permissions_{instance.requester_id}')
 
     # Invalidate cached tracking data view to force permissions check
     tracking_get_url = reverse('shipment-tracking', kwargs={'version': 'v1', 'pk': instance.shipment.id})
@@ -145,9 +147,15 @@ def trackingdata_post_save(sender, **kwargs):
     tracking_get_url = reverse('shipment-tracking', kwargs={'version': 'v1', 'pk': instance.shipment.id})
     list(find_urls([tracking_get_url + "*"], purge=True))
 
-    # Notify websocket channel
-    async_to_sync(channel_layer.group_send)(instance.shipment.owner_id,
-                                            {"type": "tracking_data.save", "tracking_data_id": instance.id})
+    # Notify websocket channel, rendering the payload once for all consumers in the group
+    from apps.consumers import AppsConsumer, send_shipment_event
+    from apps.shipments.geojson import render_point_feature
+    geojson = render_point_feature(TrackingData.objects.filter(id=instance.id))
+    send_shipment_event(instance.shipment, {
+        "type": "tracking_data.save",
+        "tracking_data_id": instance.id,
+        "tracking_data_json": AppsConsumer.render_async_tracking_data(instance.shipment_id, geojson),
+    })
 
 
 @receiver(post_save, sender=TelemetryData, dispatch_uid='telemetrydata_post_save')
@@ -160,9 +168,13 @@ def telemetrydata_post_save(sender, **kwargs):
                                 kwargs={'version': 'v1', 'shipment_pk': instance.shipment.id})
     list(find_urls([telemetry_get_url + "*"], purge=True))
 
-    # Notify websocket channel
-    async_to_sync(channel_layer.group_send)(instance.shipment.owner_id,
-                                            {"type": "telemetry_data.save", "telemetry_data_id": instance.id})
+    # Notify websocket channel, rendering the payload once for all consumers in the group
+    from apps.consumers import AppsConsumer, send_shipment_event
+    send_shipment_event(instance.shipment, {
+        "type": "telemetry_data.save",
+        "telemetry_data_id": instance.id,
+        "telemetry_data_json": AppsConsumer.render_async_telemetry_data(instance),
+    })
 
 
 @receiver(post_save_changed, sender=Shipment, fields=['quickadd_tracking'],
@@ -184,6 +196,7 @@ def shipment_quickadd_tracking_changed(sender, instance, changed_fields, **kwarg
         instance.anonymous_historical_change(shippers_reference=f'Quickadd Shipment: {instance.quickadd_tracking}',
                                              carrier_abbv=tracking_data['slug'])
         instance.refresh_from_db(fields=['shippers_reference', 'carrier_abbv'])
+        ShipmentSearchDocument.refresh(instance.id)
 
         SNSClient().aftership_tracking_update(instance, tracking_data['id'], instance.updated_by)
 
@@ -224,3 +237,30 @@ def shipment_iot_fields_changed(sender, instance, changed_fields, **kwargs):
                 iot_client.update_shadow(instance.device_id, shadow_update)
             except AWSIoTError as exc:
                 logging.error(f'Error communicating with AWS IoT during Device shadow update: {exc}')
+
+
+@receiver(post_save_changed, sender=Shipment,
+          fields=sorted({path.split('__')[0] for path in SHIPMENT_SEARCH_FIELDS} - {'pk', 'shipment_tags'}),
+          dispatch_uid='shipment_search_fields_post_save')
+def shipment_search_fields_changed(sender, instance, changed_fields, **kwargs):
+    ShipmentSearchDocument.refresh(instance.id)
+
+
+@receiver(post_save, sender=Location, dispatch_uid='location_search_post_save')
+def location_search_post_save(sender, instance, created, **kwargs):
+    if created:
+        # A new Location is not yet referenced by any Shipment
+        return
+
+    shipment_ids = Shipment.objects.filter(
+        Q(ship_from_location=instance) | Q(ship_to_location=instance) | Q(final_destination_location=instance)
+    ).values_list('id', flat=True)
+    for shipment_id in shipment_ids:
+        ShipmentSearchDocument.refresh(shipment_id)
+
+
+@receiver(post_save, sender=ShipmentTag, dispatch_uid='shipmenttag_search_post_save')
+@receiver(post_delete, sender=ShipmentTag, dispatch_uid='shipmenttag_search_post_delete')
+def shipmenttag_search_changed(sender, instance, **kwargs):
+    # Deletes may be cascading from the Shipment itself, only update an existing document in that case
+    ShipmentSearchDocument.refresh(instance.shipment_id, create=kwargs['signal'] is post_save)
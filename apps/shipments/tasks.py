@@ -2,10 +2,10 @@
 import logging
 
 from celery import shared_task
-from influxdb_metrics.loader import log_metric
 from shipchain_common.exceptions import RPCError
 
 from apps.jobs.models import AsyncActionType
+from apps.metrics import log_metric
 from .rpc import RPCClientFactory
 from .models import Shipment
 
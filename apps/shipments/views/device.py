@@ -17,7 +17,6 @@ import logging
 from json.decoder import JSONDecodeError
 
 from django.conf import settings
-from influxdb_metrics.loader import log_metric
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, MethodNotAllowed, ValidationError
@@ -26,6 +25,7 @@ from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from shipchain_common.exceptions import Custom500Error
 
+from apps.metrics import log_metric
 from apps.routes.serializers import RouteTrackingDataToDbSerializer, RouteTelemetryDataToDbSerializer
 from apps.shipments.models import Device, AccessRequest, PermissionLevel, Endpoints
 from apps.shipments.permissions import IsOwnerOrShared
@@ -17,11 +17,11 @@ limitations under the License.
 import logging
 
 from django.conf import settings
-from influxdb_metrics.loader import log_metric
 from rest_framework import viewsets, permissions, renderers
 from rest_framework.response import Response
 from shipchain_common.pagination import CustomResponsePagination
 
+from apps.metrics import log_metric
 from apps.permissions import ShipmentExists
 from ..models import Shipment
 from ..permissions import IsOwnerOrShared
@@ -51,7 +51,7 @@ class ShipmentHistoryListView(viewsets.GenericViewSet):
 
         serializer = ChangesDiffSerializer(queryset, request, kwargs['shipment_pk'])
 
-        queryset = serializer.filter_queryset(serializer.historical_queryset)
+        queryset = serializer.historical_queryset
 
         paginator = self.pagination_class()
         page = paginator.paginate_queryset(queryset, self.request, view=self)
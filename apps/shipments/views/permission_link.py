@@ -17,12 +17,12 @@ limitations under the License.
 import logging
 
 from django.conf import settings
-from influxdb_metrics.loader import log_metric
 from rest_framework import viewsets, permissions, status, mixins
 from rest_framework.response import Response
 from shipchain_common.exceptions import AWSIoTError, URLShortenerError
 from shipchain_common.utils import send_templated_email
 
+from apps.metrics import log_metric
 from apps.permissions import ShipmentExists, IsNestedOwnerShipperCarrierModerator
 from ..iot_client import URLShortener
 from ..models import PermissionLink
@@ -22,18 +22,20 @@ from django.http import HttpResponse
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from fancy_cache import cache_page
-from influxdb_metrics.loader import log_metric
 from rest_framework import permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework_json_api.views import PreloadIncludesMixin
 from shipchain_common.mixins import SerializationType
 from shipchain_common.permissions import HasViewSetActionPermissions
-from shipchain_common.utils import parse_value
 from shipchain_common.viewsets import ActionConfiguration, ConfigurableModelViewSet
 
 from apps.jobs.models import JobState
+from apps.metrics import log_metric
 from apps.permissions import owner_access_filter, get_owner_id, IsOwner, ShipmentExists
-from ..filters import ShipmentFilter, SHIPMENT_SEARCH_FIELDS, SHIPMENT_ORDERING_FIELDS
+from apps.utils import preload_for_includes
+from ..filters import ShipmentFilter, ShipmentSearchFilter, SHIPMENT_SEARCH_FIELDS, SHIPMENT_ORDERING_FIELDS, \
+    filter_customer_fields
 from ..geojson import render_filtered_point_features
 from ..models import Shipment, TrackingData, PermissionLink, TransitState, PermissionLevel, AccessRequest, Endpoints
 from ..permissions import IsOwnerOrShared, IsOwnerShipperCarrierModerator, shipment_list_wallets_filter
@@ -62,7 +64,7 @@ DELETE_PERMISSIONS = ((permissions.IsAuthenticated, IsOwner,) if settings.PROFIL
                       else (permissions.AllowAny, ))
 
 
-class ShipmentViewSet(ConfigurableModelViewSet):
+class ShipmentViewSet(PreloadIncludesMixin, ConfigurableModelViewSet):
     # We need to revisit the ConfigurableGenericViewSet to ensure
     # that it properly allow the inheritance of this attribute
     resource_name = 'Shipment'
@@ -71,10 +73,13 @@ class ShipmentViewSet(ConfigurableModelViewSet):
 
     serializer_class = ShipmentSerializer
 
+    # Related objects rendered by the default included_resources are fetched with the page of shipments
+    select_for_includes, prefetch_for_includes = preload_for_includes(ShipmentSerializer)
+
     permission_classes = ((HasViewSetActionPermissions,
                            IsOwnerOrShared, ) if settings.PROFILES_ENABLED else (permissions.AllowAny, ))
 
-    filter_backends = (filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend, )
+    filter_backends = (ShipmentSearchFilter, filters.OrderingFilter, DjangoFilterBackend, )
 
     filterset_class = ShipmentFilter
 
@@ -103,7 +108,14 @@ class ShipmentViewSet(ConfigurableModelViewSet):
     }
 
     def get_queryset(self):
-        queryset = self.queryset
+        queryset = super().get_queryset()
+
+        sparse_sources = self._sparse_fieldset_sources()
+        if sparse_sources is not None:
+            # Only load the columns backing the requested sparse fieldset
+            concrete_fields = {field.name for field in Shipment._meta.concrete_fields}
+            queryset = queryset.only('id', *sorted(sparse_sources & concrete_fields))
+
         if settings.PROFILES_ENABLED:
             queryset_filter = owner_access_filter(self.request)
 
@@ -125,12 +137,36 @@ class ShipmentViewSet(ConfigurableModelViewSet):
 
         return queryset
 
-    def _parse_customer_fields_queries(self, queryset):
-        for key, value in self.request.query_params.items():
-            if key.startswith('customer_fields__'):
-                queryset = queryset.filter(**{key: parse_value(value)})
+    def _sparse_fieldset_sources(self):
+        """
+        Model attributes backing a list request's JSON:API `fields[Shipment]` sparse fieldset, None if not requested
+        """
+        fieldset = self.request.query_params.get(f'fields[{self.resource_name}]')
+        if self.action != 'list' or not fieldset:
+            return None
+
+        declared_fields = ShipmentSerializer._declared_fields  # pylint:disable=protected-access
+        sources = set()
+        for field_name in fieldset.split(','):
+            field = declared_fields.get(field_name)
+            sources.add(field.source if field and field.source else field_name)
+        return sources
+
+    def _sparse_relations(self, relations):
+        # Includes for relations outside of the sparse fieldset are not rendered, skip preloading them
+        sparse_sources = self._sparse_fieldset_sources()
+        if relations is None or sparse_sources is None:
+            return relations
+        return [relation for relation in relations if relation in sparse_sources]
+
+    def get_select_related(self, include):
+        return self._sparse_relations(super().get_select_related(include))
+
+    def get_prefetch_related(self, include):
+        return self._sparse_relations(super().get_prefetch_related(include))
 
-        return queryset
+    def _parse_customer_fields_queries(self, queryset):
+        return filter_customer_fields(queryset, self.request.query_params)
 
     def perform_create(self, serializer):
         if settings.PROFILES_ENABLED:
@@ -17,13 +17,12 @@ limitations under the License.
 import logging
 
 from django.conf import settings
-from influxdb_metrics.loader import log_metric
 from rest_framework import permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.permissions import ShipmentExists, IsNestedOwnerShipperCarrierModerator
-from ..models import Shipment
+from apps.metrics import log_metric
+from apps.permissions import ShipmentExists, IsNestedOwnerShipperCarrierModerator, get_request_shipment
 from ..serializers import ShipmentSerializer, ShipmentActionRequestSerializer
 
 LOG = logging.getLogger('transmission')
@@ -42,7 +41,7 @@ class ShipmentActionsView(APIView):
         LOG.debug(f'Performing action on shipment with id: {kwargs["shipment_pk"]}.')
         log_metric('transmission.info', tags={'method': 'shipment.action', 'module': __name__})
 
-        shipment = Shipment.objects.get(id=kwargs['shipment_pk'])
+        shipment = get_request_shipment(request, kwargs['shipment_pk'])
         serializer = ShipmentActionRequestSerializer(data=request.data,
                                                      context={'shipment': shipment, 'request': request})
         serializer.is_valid(raise_exception=True)
@@ -26,13 +26,13 @@ from rest_framework_gis.filters import InBBoxFilter
 from rest_framework_json_api import utils
 from rest_framework_json_api import views as jsapi_views
 from rest_framework_json_api.renderers import JSONRenderer
-from shipchain_common.utils import parse_value
 
 from apps.permissions import get_owner_id
 from ..permissions import shipment_list_wallets_filter
 from ..serializers import QueryParamsSerializer, TrackingOverviewSerializer
 from ..models import TrackingData
-from ..filters import ShipmentOverviewFilter, SHIPMENT_SEARCH_FIELDS, SHIPMENT_ORDERING_FIELDS
+from ..filters import ShipmentOverviewFilter, ShipmentSearchFilter, SHIPMENT_SEARCH_FIELDS, SHIPMENT_ORDERING_FIELDS, \
+    filter_customer_fields
 
 LOG = logging.getLogger('transmission')
 
@@ -87,9 +87,10 @@ class ShipmentOverviewListView(jsapi_views.PreloadIncludesMixin,
     permission_classes = (permissions.IsAuthenticated,)
     renderer_classes = (JSONAPIGeojsonRenderer,)
 
-    filter_backends = (InBBoxFilter, filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend,)
+    filter_backends = (InBBoxFilter, ShipmentSearchFilter, filters.OrderingFilter, DjangoFilterBackend,)
     bbox_filter_field = 'point'
     search_fields = tuple([f'shipment__{field}' for field in SHIPMENT_SEARCH_FIELDS])
+    search_document_prefix = 'shipment__'
     ordering_fields = tuple([f'shipment__{field}' for field in SHIPMENT_ORDERING_FIELDS])
     filterset_class = ShipmentOverviewFilter
 
@@ -131,11 +132,7 @@ class ShipmentOverviewListView(jsapi_views.PreloadIncludesMixin,
         return queryset
 
     def _parse_customer_fields_queries(self, queryset):
-        for key, value in self.request.query_params.items():
-            if key.startswith('shipment__customer_fields__'):
-                queryset = queryset.filter(**{key: parse_value(value)})
-
-        return queryset
+        return filter_customer_fields(queryset, self.request.query_params, prefix='shipment__')
 
     def get(self, request, *args, **kwargs):
         # Validate query parameters with a request serializer
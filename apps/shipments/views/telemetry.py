@@ -25,11 +25,11 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from apps.permissions import ShipmentExists
+from apps.permissions import ShipmentExists, get_request_shipment
 from apps.routes.models import RouteTelemetryData
 from apps.routes.serializers import RouteTelemetryResponseSerializer, RouteTelemetryResponseAggregateSerializer
 from apps.shipments.filters import TelemetryFilter, RouteTelemetryFilter
-from apps.shipments.models import Shipment, TelemetryData, TransitState, AccessRequest, Endpoints, PermissionLevel
+from apps.shipments.models import TelemetryData, TransitState, AccessRequest, Endpoints, PermissionLevel
 from apps.shipments.permissions import IsOwnerOrShared
 from apps.shipments.serializers import TelemetryResponseSerializer, TelemetryResponseAggregateSerializer
 from apps.utils import Aggregates, TimeTrunc
@@ -98,7 +98,7 @@ class TelemetryViewSet(mixins.ListModelMixin,
         return queryset
 
     def get_queryset(self):
-        shipment = Shipment.objects.get(pk=self.kwargs['shipment_pk'])
+        shipment = get_request_shipment(self.request, self.kwargs['shipment_pk'])
 
         begin = (shipment.pickup_act or datetime.min).replace(tzinfo=timezone.utc)
         end = (shipment.delivery_act or datetime.max).replace(tzinfo=timezone.utc)
@@ -117,7 +117,7 @@ class TelemetryViewSet(mixins.ListModelMixin,
         return queryset.filter(timestamp__range=(begin, end))
 
     def get_serializer_class(self):
-        shipment = Shipment.objects.get(pk=self.kwargs['shipment_pk'])
+        shipment = get_request_shipment(self.request, self.kwargs['shipment_pk'])
         aggregate = self.request.query_params.get('aggregate', None)
 
         if hasattr(shipment, 'routeleg'):
@@ -16,9 +16,11 @@ limitations under the License.
 import copy
 import logging
 import json
+from collections import defaultdict
 from functools import lru_cache
 
 from django.conf import settings
+from django.contrib.postgres.fields import JSONField
 from django.core.serializers import serialize
 from django.db import models
 from django.utils.timezone import now
@@ -32,7 +34,11 @@ LOG = logging.getLogger('transmission')
 
 
 def _model_to_dict(model):
-    return json.loads(serialize("json", [model]))[0]["fields"]
+    return _models_to_dicts(model)[0]
+
+
+def _models_to_dicts(*models):
+    return [serialized["fields"] for serialized in json.loads(serialize("json", models))]
 
 
 def get_user(request=None, **kwargs):
@@ -60,14 +66,42 @@ class HistoricalChangesMixin:
                                                              from_json_field=True)
             return changes_map
 
-        current_values = _model_to_dict(self.instance)
         if old_history:
-            old_values = _model_to_dict(old_history.instance)
+            current_values, old_values = _models_to_dicts(self.instance, old_history.instance)
         else:
+            current_values = _model_to_dict(self.instance)
             old_values = {f: None for f in current_values.keys()}
 
         return self.build_changes(current_values, old_values, old_history)
 
+    def compute_changes(self, old_history):
+        """
+        Changes from old_history in the form persisted to history_changes when the record is created
+        """
+        json_fields_changes = self.diff(old_history, json_fields_only=True)
+        return {
+            'fields': [[change.field, change.old, change.new] for change in self.diff(old_history).changes],
+            'json_fields': {field_name: [[change.field, change.old, change.new] for change in delta.changes]
+                            for field_name, delta in json_fields_changes.items()},
+        }
+
+    def changes(self, json_fields_only=False):
+        """
+        Equivalent of diff(prev_record) read from the changes persisted at creation
+        """
+        if self.history_changes is None:
+            # Records created before changes were persisted
+            return self.diff(self.prev_record, json_fields_only=json_fields_only)
+
+        if json_fields_only:
+            return {field_name: self._changes_delta(changes)
+                    for field_name, changes in self.history_changes['json_fields'].items()}
+
+        return self._changes_delta(self.history_changes['fields'])
+
+    def _changes_delta(self, changes):
+        return ModelDelta([ModelChange(*change) for change in changes], [change[0] for change in changes], None, self)
+
     def build_changes(self, new_obj_dict, old_obj_dict, old_historical_obj, from_json_field=False):
         changes = []
         changed_fields = []
@@ -160,38 +194,68 @@ class TxmHistoricalRecords(HistoricalRecords):
             fields[field.name] = field
         return fields
 
-    def create_historical_record(self, instance, history_type, using=None):
-        history_date = getattr(instance, "_history_date", now())
-        history_user = self.get_history_user(instance)
-        history_change_reason = getattr(instance, "changeReason", None)
-        manager = getattr(instance, self.manager_name)
+    def _related_history_ids(self, instances):
+        """
+        Latest historical record id of the related objects in RELATED_FIELDS_WITH_HISTORY_MAP, one query per
+        related model for all of the instances.
+        """
+        related_ids = defaultdict(set)
+        for instance in instances:
+            for field in self.fields_included(instance):
+                if field.name in settings.RELATED_FIELDS_WITH_HISTORY_MAP and getattr(instance, field.attname):
+                    related_ids[field.related_model].add(getattr(instance, field.attname))
+
+        history_ids = {}
+        for related_model, ids in related_ids.items():
+            pk_name = related_model._meta.pk.name
+            history_ids[related_model] = dict(
+                related_model.history.filter(**{f'{pk_name}__in': ids})
+                .order_by(pk_name, '-history_date', '-history_id').distinct(pk_name)
+                .values_list(pk_name, 'history_id')
+            )
+        return history_ids
+
+    def _build_historical_record(self, instance, history_type, history_date, related_history_ids, overrides):
+        history_user = overrides['history_user'] if 'history_user' in overrides else \
+            self.get_history_user(instance)
 
         attrs = {}
         for field in self.fields_included(instance):
-            related_instance = getattr(instance, field.name, None)
-            if related_instance and hasattr(related_instance, 'history'):
-                attrs[field.name] = related_instance.history.first()
-            else:
-                attrs[field.name] = getattr(instance, field.name)
+            value = getattr(instance, field.attname)
+            if field.name in settings.RELATED_FIELDS_WITH_HISTORY_MAP and value:
+                value = related_history_ids[field.related_model].get(value)
+            attrs[field.attname] = value
+        attrs.update({field: value for field, value in overrides.items() if field != 'history_user'})
 
-        history_instance = manager.model(
+        return getattr(instance, self.manager_name).model(
             history_date=history_date,
             history_type=history_type,
             history_user=history_user,
-            history_change_reason=history_change_reason,
+            history_change_reason=getattr(instance, "changeReason", None),
             **attrs
         )
 
+    def create_historical_record(self, instance, history_type, using=None, **overrides):
+        """
+        :param overrides: history_user and/or field values to record instead of the instance's
+        """
+        history_date = getattr(instance, "_history_date", now())
+        manager = getattr(instance, self.manager_name)
+
+        history_instance = self._build_historical_record(instance, history_type, history_date,
+                                                         self._related_history_ids([instance]), overrides)
+
         pre_create_historical_record.send(
             sender=manager.model,
             instance=instance,
             history_date=history_date,
-            history_user=history_user,
-            history_change_reason=history_change_reason,
+            history_user=history_instance.history_user,
+            history_change_reason=history_instance.history_change_reason,
             history_instance=history_instance,
             using=using,
         )
 
+        history_instance.history_changes = history_instance.compute_changes(manager.first())
         history_instance.save(using=using)
 
         post_create_historical_record.send(
@@ -199,14 +263,48 @@ class TxmHistoricalRecords(HistoricalRecords):
             instance=instance,
             history_instance=history_instance,
             history_date=history_date,
-            history_user=history_user,
-            history_change_reason=history_change_reason,
+            history_user=history_instance.history_user,
+            history_change_reason=history_instance.history_change_reason,
             using=using,
         )
 
+        return history_instance
+
+    def bulk_create_historical_records(self, instances, history_type, using=None, batch_size=None, **overrides):
+        """
+        Create the historical records of many instances of a model with a constant number of queries.
+        Like simple_history's bulk_history_create, the create historical record signals are not sent.
+        """
+        if not instances:
+            return []
+
+        model = type(instances[0])
+        pk_name = model._meta.pk.name
+        history_manager = getattr(model, self.manager_name)
+        history_date = now()
+        related_history_ids = self._related_history_ids(instances)
+
+        prev_records = {
+            getattr(prev_record, pk_name): prev_record
+            for prev_record in history_manager.filter(**{f'{pk_name}__in': [instance.pk for instance in instances]})
+            .order_by(pk_name, '-history_date', '-history_id').distinct(pk_name)
+        }
+
+        history_instances = []
+        for instance in instances:
+            history_instance = self._build_historical_record(
+                instance, history_type, getattr(instance, "_history_date", history_date), related_history_ids,
+                overrides)
+            history_instance.history_changes = history_instance.compute_changes(prev_records.get(instance.pk))
+            history_instances.append(history_instance)
+
+        return history_manager.model._default_manager.using(using).bulk_create(history_instances,
+                                                                                batch_size=batch_size)
+
     def get_extra_fields(self, model, fields):
         extra_fields = super().get_extra_fields(model, fields)
         extra_fields['history_date'] = models.DateTimeField(db_index=True)
+        extra_fields['history_changes'] = JSONField(null=True, blank=True, editable=False)
         return extra_fields
 
 
@@ -228,12 +326,10 @@ class AnonymousHistoricalMixin:
 
         def create_historical_instance(obj, h_type):
             # Manual creation of a historical object
-            TxmHistoricalRecords().create_historical_record(obj, h_type)
-            h_instance = obj.history.first()
-            h_instance.history_user = user
-            h_instance.updated_by = user
-            h_instance.save()
-            return h_instance
+            overrides = {'history_user': user}
+            if hasattr(obj, 'updated_by'):
+                overrides['updated_by'] = user
+            return TxmHistoricalRecords().create_historical_record(obj, h_type, **overrides)
 
         if only_history:
             historical_object = create_historical_instance(self, history_type)
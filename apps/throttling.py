@@ -1,21 +1,32 @@
 import logging
 from calendar import monthrange
 from datetime import datetime
-from influxdb_metrics.loader import log_metric
 
 from rest_framework import throttling
 
+from apps.metrics import log_metric
+
 LOG = logging.getLogger('transmission')
 
+# The window is as long as the current month, a bucket must outlive the longest window (31 days) plus its own day
+BUCKET_TTL = 32 * 86400
+
 
 class MonthlyRateThrottle(throttling.SimpleRateThrottle):
+    """
+    Limits the non-GET requests of an organization to the monthly_rate_limit of its JWT, over a window of a month
+    sliding by day. Requests are counted in daily cache buckets: each request reads the window's buckets in a single
+    call and atomically increments the current day's one.
+    """
+
     def __init__(self):
         now = datetime.now()
         # Rate limit is dynamically extracted from JWT
         self.duration = monthrange(now.year, now.month)[1] * 86400
         # Initialize here to avoid pylint error
         self.key = None
-        self.history = None
+        self.window_start = None
+        self.window_counts = None
         self.now = None
 
     def get_cache_key(self, request, view):
@@ -24,11 +35,14 @@ class MonthlyRateThrottle(throttling.SimpleRateThrottle):
 
         return request.user.token.get('organization_id', None)
 
+    def get_bucket_key(self, day):
+        return f'monthly_rate_throttle_{self.key}_{day}'
+
     def allow_request(self, request, view):
         if request.method == 'GET':
             return True
 
-        self.key = cache_key = self.get_cache_key(request, view)
+        self.key = self.get_cache_key(request, view)
 
         if not self.key:
             return True
@@ -38,28 +52,33 @@ class MonthlyRateThrottle(throttling.SimpleRateThrottle):
         if not self.num_requests:
             return True
 
-        self.history = self.cache.get(cache_key, [])
-        self.now = datetime.now().timestamp()
+        self.now = datetime.now()
+        today = self.now.date().toordinal()
+        self.window_start = today - self.duration // 86400 + 1
+        bucket_keys = [self.get_bucket_key(day) for day in range(self.window_start, today + 1)]
 
-        # Drop any requests from the history which have now passed the
-        # throttle duration
-        while self.history and self.history[-1] <= self.now - self.duration:
-            self.history.pop()
+        # Count this request first, concurrent requests can't both take the last one available
+        self.cache.add(bucket_keys[-1], 0, timeout=BUCKET_TTL)
+        today_count = self.cache.incr(bucket_keys[-1])
 
-        if len(self.history) >= self.num_requests:
+        previous_counts = self.cache.get_many(bucket_keys[:-1])
+        self.window_counts = [previous_counts.get(bucket_key, 0) for bucket_key in bucket_keys[:-1]] + [today_count]
+
+        if sum(self.window_counts) > self.num_requests:
+            self.cache.decr(bucket_keys[-1])
+            self.window_counts[-1] -= 1
             return self.throttle_failure()
 
         return self.throttle_success()
 
     def throttle_success(self):
         """
-        Inserts the current request's timestamp along with the key
-        into the cache.
+        The request is already counted in the current day's bucket.
         """
         log_metric('transmission.info', tags={'method': 'throttling.MonthlyRateThrottle', 'module': __name__,
                                               'organization_id': self.key, 'success': True})
 
-        return super(MonthlyRateThrottle, self).throttle_success()
+        return True
 
     def throttle_failure(self):
         """
@@ -68,3 +87,12 @@ class MonthlyRateThrottle(throttling.SimpleRateThrottle):
         log_metric('transmission.info', tags={'method': 'throttling.MonthlyRateThrottle', 'module': __name__,
                                               'organization_id': self.key, 'success': False})
         return super(MonthlyRateThrottle, self).throttle_failure()
+
+    def wait(self):
+        """
+        Seconds until the oldest requests of the window drop out of it
+        """
+        oldest_day = next((self.window_start + index for index, count in enumerate(self.window_counts) if count),
+                          self.now.date().toordinal())
+        oldest_day_expiry = datetime.fromordinal(oldest_day + len(self.window_counts))
+        return max((oldest_day_expiry - self.now).total_seconds(), 0)
@@ -61,6 +61,8 @@ nested_route.register(r'legs', routes.RouteLegViewSet, basename='route-legs')
 
 urlpatterns = [
     re_path('health/?$', management.health_check, name='health'),
+    re_path('health/live/?$', management.liveness_check, name='health-live'),
+    re_path('health/ready/?$', management.readiness_check, name='health-ready'),
     re_path(r'(^(api/v1/schema)|^$)', TemplateView.as_view(template_name='apidoc.html'), name='api_schema'),
     re_path(r'^admin/', admin.site.urls),
     re_path(f'{API_PREFIX[1:]}/documents/events/?$', documents.S3Events.as_view(), name='document-events'),
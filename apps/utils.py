@@ -2,6 +2,8 @@ from functools import partial
 from enumfields import Enum
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Lookup
 from django.db.models.aggregates import Avg, Max, Min
 from django.db.models.functions import TruncMinute, TruncHour, TruncDay
 
@@ -53,7 +55,14 @@ class AliasSerializerMixin:
         return self.getvalue()
 
 
+def presigned_s3_cache_key(method, bucket, key, content_type=None):
+    return f'presigned_s3_{method}_{bucket}_{key}_{content_type}'
+
+
 class S3PreSignedMixin:
+    # Pre-signed values read by a list serializer with a single cache call, keyed by presigned_s3_cache_key
+    presigned_s3_cache = None
+
     def get_content_type(self, extension):
         extension = extension if extension.startswith('.') else f'.{extension}'
         content_type = settings.MIME_TYPE_MAP.get(extension)
@@ -61,21 +70,48 @@ class S3PreSignedMixin:
             raise exceptions.ValidationError(f'Unrecognized file type: {extension}')
         return content_type
 
+    def cached_presigned_s3(self, method, key, content_type, sign):
+        cache_key = presigned_s3_cache_key(method, self._s3_bucket, key, content_type)
+        if self.presigned_s3_cache is not None:
+            presigned = self.presigned_s3_cache.get(cache_key)
+        else:
+            presigned = cache.get(cache_key)
+
+        if presigned is None:
+            presigned = sign()
+            cache.set(cache_key, presigned, timeout=settings.S3_PRESIGNED_CACHE_TTL)
+        return presigned
+
     def get_presigned_s3(self, obj):
         content_type = self.get_content_type(obj.file_type.name.lower())
 
-        pre_signed_post = settings.S3_CLIENT.generate_presigned_post(
-            Bucket=self._s3_bucket,
-            Key=obj.s3_key,
-            Fields={"acl": "private", "Content-Type": content_type},
-            Conditions=[
-                {"acl": "private"},
-                {"Content-Type": content_type},
-                ["content-length-range", 0, settings.S3_MAX_BYTES]
-            ],
-            ExpiresIn=settings.S3_URL_LIFE
-        )
-        return pre_signed_post
+        def sign():
+            return settings.S3_CLIENT.generate_presigned_post(
+                Bucket=self._s3_bucket,
+                Key=obj.s3_key,
+                Fields={"acl": "private", "Content-Type": content_type},
+                Conditions=[
+                    {"acl": "private"},
+                    {"Content-Type": content_type},
+                    ["content-length-range", 0, settings.S3_MAX_BYTES]
+                ],
+                ExpiresIn=settings.S3_URL_LIFE
+            )
+
+        return self.cached_presigned_s3('post', obj.s3_key, content_type, sign)
+
+    def get_presigned_s3_url(self, key):
+        def sign():
+            return settings.S3_CLIENT.generate_presigned_url(
+                'get_object',
+                Params={
+                    'Bucket': f"{self._s3_bucket}",
+                    'Key': key
+                },
+                ExpiresIn=settings.S3_URL_LIFE
+            )
+
+        return self.cached_presigned_s3('get', key, None, sign)
 
 
 class UploadStatus(Enum):
@@ -102,6 +138,12 @@ class TimeTrunc(Enum):
 
 
 def retrieve_profiles_wallet_ids(request):
+    cache_key = f'profiles_wallet_ids_{request.user.id}'
+    if settings.PROFILES_WALLET_IDS_TTL:
+        wallet_ids = cache.get(cache_key)
+        if wallet_ids is not None:
+            return wallet_ids
+
     response = settings.REQUESTS_SESSION.get(
         f'{settings.PROFILES_URL}/api/v1/wallet?page_size=9999&is_active',
         headers={'Authorization': 'JWT {}'.format(get_jwt_from_request(request))}
@@ -109,7 +151,58 @@ def retrieve_profiles_wallet_ids(request):
     if not response.ok:
         raise Custom500Error(detail='Invalid response from profiles', status_code=response.status_code)
 
-    return [data['id'] for data in response.json()['data']]
+    wallet_ids = [data['id'] for data in response.json()['data']]
+    if settings.PROFILES_WALLET_IDS_TTL:
+        cache.set(cache_key, wallet_ids, settings.PROFILES_WALLET_IDS_TTL)
+    return wallet_ids
+
+
+def invalidate_profiles_wallet_ids(user_id, wallet_id=None, has_access=True):
+    """
+    Drop the cached Profiles wallet ids of user_id.
+    If wallet_id is provided, the cache is only dropped when it disagrees with Profiles' latest answer for that
+    wallet: a wallet the user has access to is missing from it, or a wallet the user lost access to is in it.
+    """
+    cache_key = f'profiles_wallet_ids_{user_id}'
+    if wallet_id:
+        wallet_ids = cache.get(cache_key)
+        if wallet_ids is None or (wallet_id in wallet_ids) == has_access:
+            return
+    cache.delete(cache_key)
+
+
+@CharField.register_lookup
+class AnyLookup(Lookup):
+    """
+    `field__any=[...]` compares against a single array parameter (`field = ANY(%s)`) instead of an IN list
+    """
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} = ANY({rhs})', lhs_params + rhs_params
+
+
+def preload_for_includes(serializer_class):
+    """
+    Build PreloadIncludesMixin select_for_includes/prefetch_for_includes from a serializer's included_serializers
+    """
+    model_meta = serializer_class.Meta.model._meta  # pylint:disable=protected-access
+    declared_fields = serializer_class._declared_fields  # pylint:disable=protected-access
+    select_related, prefetch_related = [], []
+
+    for include in serializer_class.included_serializers:
+        field = declared_fields.get(include)
+        source = field.source if field and field.source else include
+        relation = model_meta.get_field(source)
+        if relation.many_to_many or relation.one_to_many:
+            prefetch_related.append(source)
+        else:
+            select_related.append(source)
+
+    return {'__all__': select_related}, {'__all__': prefetch_related}
 
 
 class PermissionResourceRelatedField(RelatedFieldPermissionMixin, ResourceRelatedField):
@@ -6,6 +6,36 @@ WALLET_TIMEOUT = 900
 # The maximum timeout that Transmission will 'lock' a vault_id, preventing concurrent vault writes
 VAULT_TIMEOUT = 120
 
+# Window in seconds during which repeated saves of an AsyncJob in the same state are not pushed to websockets
+ASYNCJOB_NOTIFICATION_DEBOUNCE = 300
+
+# Time in seconds a Profiles wallet access check is cached for a user
+PROFILES_WALLET_ACCESS_TTL = 60
+
+# Time in seconds the list of a user's Profiles wallet ids is cached for shipment list filtering.
+# Wallets added or removed in Profiles are only seen by list filters once it expires, unless Transmission asks
+# Profiles about that wallet first (shipment creation, permission checks), which refreshes the list.
+PROFILES_WALLET_IDS_TTL = 15
+
+# Number of threads of a request running its Profiles wallet checks (shipper, carrier, moderator) concurrently,
+# 1 runs them serially
+PROFILES_PERMISSION_WORKERS = 3
+
+# Time in seconds a document's presence in the S3 bucket is cached for, the bucket expires documents restored from vault
+DOCUMENT_S3_KEY_TTL = 300
+
+# Number of rows of a shipment import validated and created per transaction
+SHIPMENT_IMPORT_CHUNK_SIZE = 500
+
+# Number of threads running the Engine vault calls of a shipment import chunk concurrently
+SHIPMENT_IMPORT_WORKERS = 16
+
+# Time in seconds the readiness check waits for the cache and the channel layer
+HEALTH_CHECK_TIMEOUT = 2
+
+# Time in seconds before the health check builds the migration plan again while migrations are pending
+HEALTH_MIGRATION_CHECK_TTL = 30
+
 # Celery retry intervals
 CELERY_WALLET_RETRY = 30
 CELERY_TXHASH_RETRY = 30
@@ -302,6 +302,10 @@ STATIC_URL = '/static/'
 
 
 INFLUXDB_DISABLED = True
+# Metrics logged with apps.metrics.log_metric are aggregated in-process and written every INFLUXDB_FLUSH_INTERVAL
+# seconds, series beyond INFLUXDB_MAX_SERIES are dropped until the next flush
+INFLUXDB_FLUSH_INTERVAL = int(os.environ.get('INFLUXDB_FLUSH_INTERVAL', 10))
+INFLUXDB_MAX_SERIES = int(os.environ.get('INFLUXDB_MAX_SERIES', 1000))
 INFLUXDB_URL = os.environ.get('INFLUXDB_URL')
 if INFLUXDB_URL:
     INFLUXDB_DISABLED = False
@@ -312,6 +316,8 @@ if INFLUXDB_URL:
     INFLUXDB_PASSWORD = None
     INFLUXDB_DATABASE = INFLUXDB_URL.path[1:]
     INFLUXDB_TIMEOUT = 1
+    # Request middleware and email backend metrics are written by influxdb_metrics outside of the request thread
+    INFLUXDB_USE_THREADING = True
 
     EMAIL_BACKEND = 'influxdb_metrics.email.InfluxDbEmailBackend'
 
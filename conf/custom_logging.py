@@ -82,13 +82,15 @@ if PROFILES_ENABLED:
 
 if BOTO3_SESSION:
     LOGGING['handlers']['cloudwatch'] = {
-        'class': 'watchtower.CloudWatchLogHandler',
+        # Records are queued and shipped in batches by a background thread, logging never waits on CloudWatch
+        'class': 'apps.log_handlers.QueuedCloudWatchLogHandler',
+        'max_queue_size': 10000,
+        'send_interval': 10,
         'boto3_session': BOTO3_SESSION,
         'log_group': f'transmission-django-{ENVIRONMENT}',
         'create_log_group': True,
         'stream_name': 'logs-' + SERVICE + '-{strftime:%Y-%m-%d}',
         'formatter': 'logstash-style',
-        'use_queues': False,
     }
     LOGGING['loggers']['django']['handlers'].append('cloudwatch')
     LOGGING['loggers']['transmission']['handlers'].append('cloudwatch')
@@ -14,6 +14,8 @@ MIME_TYPE_MAP = mimetypes.types_map
 
 # s3 Pre-signed url life in seconds
 S3_URL_LIFE = 1800
+# Time in seconds a pre-signed url or post is reused for, they remain valid for the rest of S3_URL_LIFE once served
+S3_PRESIGNED_CACHE_TTL = S3_URL_LIFE - 300
 S3_MAX_BYTES = 12500000
 
 
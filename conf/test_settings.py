@@ -29,6 +29,12 @@ MILLISECONDS_THRESHOLD = 500
 
 SUBSCRIBE_EVENTS = False
 
+# Wallet mocks change within tests, only memoize wallet access per request
+PROFILES_WALLET_ACCESS_TTL = 0
+PROFILES_WALLET_IDS_TTL = 0
+# Profiles call assertions expect the wallet checks to run serially
+PROFILES_PERMISSION_WORKERS = 1
+
 for name, logger in LOGGING['loggers'].items():
     logger['handlers'] = [h for h in logger.get('handlers', []) if h != 'elasticsearch']
     if logger.get('level') == 'DEBUG':
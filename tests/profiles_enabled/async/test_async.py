@@ -21,12 +21,13 @@ from asgiref.sync import sync_to_async
 from channels.layers import get_channel_layer
 from channels.testing import WebsocketCommunicator
 from django.db import models
+from shipchain_common.authentication import passive_credentials_auth
 from shipchain_common.test_utils import get_jwt
 from asynctest import patch
 from shipchain_common.utils import random_id
 
 from apps.consumers import EventTypes, AppsConsumer
-from apps.jobs.models import AsyncJob, MessageType
+from apps.jobs.models import AsyncActionType, AsyncJob, MessageType, JobState
 from apps.jobs.signals import job_update
 from apps.routing import application
 from apps.shipments.models import Shipment, Device, TrackingData, TelemetryData
@@ -111,6 +112,32 @@ async def test_jwt_refresh():
             assert not fake_close.called
 
 
+@pytest.mark.asyncio
+async def test_auth_cached_per_connection():
+    consumer = AppsConsumer(scope={'subprotocols': [f'base64.jwt.{await async_get_jwt()}'],
+                                   'url_route': {'kwargs': {'user_id': USER_ID}}})
+
+    with patch("channels.generic.websocket.AsyncWebsocketConsumer.send") as fake_send:
+        with patch("apps.authentication.passive_credentials_auth", wraps=passive_credentials_auth) as fake_auth:
+            # Token is only validated once for repeated pushes
+            await consumer.send('{"hello": "world"}')
+            await consumer.send('{"hello": "world"}')
+            assert fake_send.call_count == 2
+            assert fake_auth.call_count == 1
+
+            # refresh_jwt forces re-validation
+            await consumer.receive(json.dumps({"event": "refresh_jwt", "data": await async_get_jwt()}))
+            assert fake_auth.call_count == 2
+            await consumer.send('{"hello": "world"}')
+            assert fake_auth.call_count == 2
+
+            # An expired cached token is re-validated before sending
+            consumer.scope['jwt_exp'] = 0
+            await consumer.send('{"hello": "world"}')
+            assert fake_auth.call_count == 3
+            assert fake_send.call_count == 4
+
+
 @pytest.mark.asyncio
 @pytest.mark.django_db
 async def test_job_notification(communicator):
@@ -152,6 +179,63 @@ async def test_job_notification(communicator):
     await communicator.disconnect()
 
 
+@pytest.mark.asyncio
+@pytest.mark.django_db
+async def test_job_notification_state_changes_only(communicator):
+    class DummyRPCClient:
+        def do_whatever(self):
+            pass
+
+    # Disable Shipment post-save signal
+    await sync_to_async(models.signals.post_save.disconnect)(sender=Shipment, dispatch_uid='shipment_post_save')
+
+    shipment, _ = await sync_to_async(Shipment.objects.get_or_create)(
+        id=random_id(),
+        owner_id=USER_ID,
+        storage_credentials_id='FAKE_STORAGE_CREDENTIALS_ID',
+        shipper_wallet_id='FAKE_SHIPPER_WALLET_ID',
+        carrier_wallet_id='FAKE_CARRIER_WALLET_ID',
+        contract_version='1.0.0'
+    )
+
+    # Re-enable Shipment post-save signal
+    await sync_to_async(models.signals.post_save.connect)(shipment_post_save, sender=Shipment,
+                                                          dispatch_uid='shipment_post_save')
+
+    job = await sync_to_async(AsyncJob.rpc_job_for_listener)(rpc_method=DummyRPCClient.do_whatever, rpc_parameters=[],
+                                                             signing_wallet_id='FAKE_WALLET_ID', shipment=shipment)
+
+    # Creation is always pushed
+    response = await communicator.receive_json_from()
+    assert response['event'] == EventTypes.asyncjob_update.name
+    assert response['data']['data']['id'] == job.id
+
+    # Saving without a state change is not pushed
+    job.last_try = datetime.datetime.now(datetime.timezone.utc)
+    await sync_to_async(job.save)()
+    assert await communicator.receive_nothing()
+
+    # A state change is pushed once
+    job.state = JobState.RUNNING
+    await sync_to_async(job.save)()
+    await sync_to_async(job.save)()
+    response = await communicator.receive_json_from()
+    assert response['event'] == EventTypes.asyncjob_update.name
+    assert response['data']['data']['attributes']['state'] == JobState.RUNNING.name
+    assert await communicator.receive_nothing()
+
+    # A new action within the same state is pushed with the next save
+    action = await sync_to_async(job.actions.create)(action_type=AsyncActionType.SHIPMENT)
+    await sync_to_async(job.save)()
+    response = await communicator.receive_json_from()
+    assert response['event'] == EventTypes.asyncjob_update.name
+    assert action.id in [related['id'] for related in response['data']['data']['relationships']['actions']['data']]
+    await sync_to_async(job.save)()
+    assert await communicator.receive_nothing()
+
+    await communicator.disconnect()
+
+
 @pytest.mark.asyncio
 @pytest.mark.django_db
 async def test_trackingdata_notification(communicator):
@@ -283,3 +367,74 @@ async def test_shipmentupdate_notification(communicator):
     assert response['data']['data']['attributes']['carriers_scac'] == shipment.carriers_scac
 
     await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+async def test_shipment_subscriptions(communicator):
+    # Disable Shipment post-save signal
+    await sync_to_async(models.signals.post_save.disconnect)(sender=Shipment, dispatch_uid='shipment_post_save')
+
+    watched_shipment, other_shipment = [await sync_to_async(Shipment.objects.create)(
+        id=random_id(),
+        owner_id=USER_ID,
+        storage_credentials_id=random_id(),
+        shipper_wallet_id=random_id(),
+        carrier_wallet_id=random_id(),
+        contract_version='1.0.0'
+    ) for _ in range(2)]
+
+    # Re-enable Shipment post-save signal
+    await sync_to_async(models.signals.post_save.connect)(shipment_post_save, sender=Shipment,
+                                                          dispatch_uid='shipment_post_save')
+
+    device = await sync_to_async(Device.objects.create)(id=random_id())
+
+    async def create_tracking_data(shipment):
+        return await sync_to_async(TrackingData.objects.create)(
+            id=random_id(),
+            device=device,
+            shipment=shipment,
+            latitude=75.65,
+            longitude=84.36,
+            altitude=36.65,
+            source='gps',
+            uncertainty=66,
+            speed=36,
+            version='1.1.0',
+            timestamp=datetime.datetime.now(datetime.timezone.utc)
+        )
+
+    # Invalid subscription messages are rejected
+    await communicator.send_json_to({"event": "subscribe", "data": watched_shipment.id})
+    response = await communicator.receive_json_from()
+    assert response['event'] == EventTypes.error.name
+
+    # Shipments not owned by the user are ignored
+    await communicator.send_json_to({"event": "subscribe", "data": [watched_shipment.id, random_id()]})
+    response = await communicator.receive_json_from()
+    assert response['event'] == EventTypes.subscriptions_update.name
+    assert response['data'] == [watched_shipment.id]
+
+    # Only events for subscribed shipments are pushed
+    await create_tracking_data(other_shipment)
+    assert await communicator.receive_nothing()
+
+    await create_tracking_data(watched_shipment)
+    response = await communicator.receive_json_from()
+    assert response['event'] == EventTypes.trackingdata_update.name
+    assert response['data']['shipment_id'] == watched_shipment.id
+    assert await communicator.receive_nothing()
+
+    # Removing every subscription restores the unfiltered stream
+    await communicator.send_json_to({"event": "unsubscribe", "data": [watched_shipment.id]})
+    response = await communicator.receive_json_from()
+    assert response['event'] == EventTypes.subscriptions_update.name
+    assert response['data'] == []
+
+    await create_tracking_data(other_shipment)
+    response = await communicator.receive_json_from()
+    assert response['event'] == EventTypes.trackingdata_update.name
+    assert response['data']['shipment_id'] == other_shipment.id
+
+    await communicator.disconnect()
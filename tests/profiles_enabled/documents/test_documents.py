@@ -5,12 +5,15 @@ from unittest import mock
 import os
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
-from pytest import fixture
+from pytest import fixture, raises
+from shipchain_common.exceptions import RPCError
 from shipchain_common.test_utils import AssertionHelper, mocked_rpc_response
 from shipchain_common.utils import random_id
 
 from apps.documents.models import FileType, DocumentType
+from apps.documents.tasks import document_s3_restore_cache_key, put_document_in_s3_task
 from apps.utils import UploadStatus
 
 
@@ -341,6 +344,59 @@ class TestDocumentsList:
         response = client_alice.get(self.shipment_alice_two_url)
         AssertionHelper.HTTP_200(response, entity_refs=[entity_ref_document_shipment_two_alice], count=1, is_list=True)
 
+    def test_presigned_s3_resolved_for_list(self, client_alice, mock_s3_buckets, document_shipment_alice,
+                                            document_shipment_alice_two, mocker):
+        for document in (document_shipment_alice, document_shipment_alice_two):
+            document.upload_status = UploadStatus.COMPLETE
+            document.save()
+        mock_s3_buckets.Object(settings.DOCUMENT_MANAGEMENT_BUCKET, document_shipment_alice.s3_key).put(Body=b'pdf')
+        mock_put_document_in_s3 = mocker.patch('apps.documents.rpc.DocumentRPCClient.put_document_in_s3')
+        mock_delay = mocker.patch('apps.documents.tasks.put_document_in_s3_task.delay')
+
+        response = client_alice.get(self.shipment_alice_url)
+        AssertionHelper.HTTP_200(response, is_list=True, count=2)
+        presigned_s3 = {document['id']: document['meta']['presigned_s3'] for document in response.json()['data']}
+        assert document_shipment_alice.s3_key in presigned_s3[document_shipment_alice.id]
+        # The missing document is restored from vault in the background
+        assert presigned_s3[document_shipment_alice_two.id] == UploadStatus.PENDING.name
+        mock_put_document_in_s3.assert_not_called()
+        mock_delay.assert_called_once_with(document_shipment_alice_two.id)
+
+        # The restore is only queued once while in progress
+        response = client_alice.get(self.shipment_alice_url)
+        AssertionHelper.HTTP_200(response, is_list=True, count=2)
+        mock_delay.assert_called_once_with(document_shipment_alice_two.id)
+
+    def test_failed_restore_released(self, document_shipment_alice, mocker):
+        cache.add(document_s3_restore_cache_key(document_shipment_alice.id), True)
+        mocker.patch('apps.documents.rpc.DocumentRPCClient.put_document_in_s3',
+                     side_effect=RPCError('Invalid response from Engine'))
+
+        with raises(RPCError):
+            put_document_in_s3_task(document_shipment_alice.id)
+
+        # The next request for the document queues the restore again
+        assert cache.get(document_s3_restore_cache_key(document_shipment_alice.id)) is None
+
+    def test_presigned_s3_cached(self, client_alice, mock_s3_buckets, document_shipment_alice,
+                                 document_shipment_alice_two, mocker):
+        document_shipment_alice.upload_status = UploadStatus.COMPLETE
+        document_shipment_alice.save()
+        mock_s3_buckets.Object(settings.DOCUMENT_MANAGEMENT_BUCKET, document_shipment_alice.s3_key).put(Body=b'pdf')
+        generate_presigned_url = mocker.spy(settings.S3_CLIENT, 'generate_presigned_url')
+        generate_presigned_post = mocker.spy(settings.S3_CLIENT, 'generate_presigned_post')
+
+        first_response = client_alice.get(self.shipment_alice_url)
+        AssertionHelper.HTTP_200(first_response, is_list=True, count=2)
+        second_response = client_alice.get(self.shipment_alice_url)
+        AssertionHelper.HTTP_200(second_response, is_list=True, count=2)
+
+        assert [document['meta'] for document in first_response.json()['data']] == \
+            [document['meta'] for document in second_response.json()['data']]
+        # The document and its thumbnail urls, and the upload post of the pending document, are only signed once
+        assert generate_presigned_url.call_count == 2
+        assert generate_presigned_post.call_count == 1
+
     def test_filter(self, client_alice, entity_ref_document_shipment_alice, entity_ref_document_shipment_alice_two):
         response = client_alice.get(f'{self.shipment_alice_url}?file_type={entity_ref_document_shipment_alice.attributes["file_type"]}')
         AssertionHelper.HTTP_200(response, is_list=True,
@@ -1,11 +1,14 @@
 import json
 from unittest import mock
 
+import pytest
 import requests
 from django.urls import reverse
+from shipchain_common.exceptions import RPCError
 from shipchain_common.test_utils import AssertionHelper, mocked_rpc_response
 from shipchain_common.utils import random_id
 
+from apps.documents.tasks import add_documents_from_s3
 from apps.utils import UploadStatus
 
 
@@ -22,12 +25,25 @@ class TestS3EventNotification:
         response = api_client.post(self.url, json.dumps(self.s3_event))
         AssertionHelper.HTTP_403(response)
 
-    def test_requires_document(self, api_client, document_shipment_alice, mock_s3_buckets):
+    def test_requires_document(self, api_client, document_shipment_alice, mock_s3_buckets, mocker):
+        mock_delay = mocker.patch('apps.documents.tasks.add_documents_from_s3.delay')
         self.s3_event["Records"][0]["s3"]["object"]["key"] = f"{random_id()}/{random_id()}/{random_id()}/{random_id()}.png"
         response = api_client.post(self.url, json.dumps(self.s3_event), content_type="application/json",
                                    X_NGINX_SOURCE='internal', X_SSL_CLIENT_VERIFY='SUCCESS',
                                    X_SSL_CLIENT_DN='/CN=document-management-s3-hook.test-internal')
         AssertionHelper.HTTP_400(response, error='Document not found with ID')
+        mock_delay.assert_not_called()
+
+        vault_id = random_id()
+        key = f"{random_id()}/{random_id()}/{vault_id}/{document_shipment_alice.id}.png"
+        self.s3_event["Records"][0]["s3"]["object"]["key"] = key
+        response = api_client.post(self.url, json.dumps(self.s3_event), content_type="application/json",
+                                   X_NGINX_SOURCE='internal', X_SSL_CLIENT_VERIFY='SUCCESS',
+                                   X_SSL_CLIENT_DN='/CN=document-management-s3-hook.test-internal')
+        # The documents are saved to vault in the background
+        AssertionHelper.HTTP_204(response)
+        records = [{'bucket': 'document-management-s3-local', 'key': key}]
+        mock_delay.assert_called_once_with(vault_id, records)
 
         with mock.patch.object(requests.Session, 'post') as mock_method:
             mock_method.return_value = mocked_rpc_response({
@@ -37,11 +53,10 @@ class TestS3EventNotification:
                 },
                 "id": 0
             })
-            self.s3_event["Records"][0]["s3"]["object"]["key"] = f"{random_id()}/{random_id()}/{random_id()}/{document_shipment_alice.id}.png"
-            response = api_client.post(self.url, json.dumps(self.s3_event), content_type="application/json",
-                                       X_NGINX_SOURCE='internal', X_SSL_CLIENT_VERIFY='SUCCESS',
-                                       X_SSL_CLIENT_DN='/CN=document-management-s3-hook.test-internal')
-            AssertionHelper.HTTP_500(response, error='Invalid response from Engine')
+            with pytest.raises(RPCError, match='Invalid response from Engine'):
+                add_documents_from_s3(vault_id, records)
+            document_shipment_alice.refresh_from_db()
+            assert document_shipment_alice.upload_status == UploadStatus.PENDING
 
             mock_method.return_value = mocked_rpc_response({
                 "jsonrpc": "2.0",
@@ -53,15 +68,32 @@ class TestS3EventNotification:
                 },
                 "id": 0
             })
-            self.s3_event["Records"][0]["s3"]["object"]["key"] = f"{random_id()}/{random_id()}/{random_id()}/{document_shipment_alice.id}.png"
-            response = api_client.post(self.url, json.dumps(self.s3_event), content_type="application/json",
-                                       X_NGINX_SOURCE='internal', X_SSL_CLIENT_VERIFY='SUCCESS',
-                                       X_SSL_CLIENT_DN='/CN=document-management-s3-hook.test-internal')
-            AssertionHelper.HTTP_204(response)
+            add_documents_from_s3(vault_id, records)
             document_shipment_alice.refresh_from_db()
             assert document_shipment_alice.upload_status == UploadStatus.COMPLETE
 
-    def test_idempotent(self, api_client, document_shipment_alice):
+    def test_grouped_by_vault(self, api_client, document_shipment_alice, document_shipment_alice_two,
+                              document_shipment_two_alice, mocker):
+        mock_delay = mocker.patch('apps.documents.tasks.add_documents_from_s3.delay')
+        keys = {document.id: f'{random_id()}/{random_id()}/{document.shipment.vault_id}/{document.id}.png'
+                for document in (document_shipment_alice, document_shipment_alice_two, document_shipment_two_alice)}
+        s3_event = {"Records": [{"s3": {
+            "bucket": {"name": "document-management-s3-local"},
+            "object": {"key": key}
+        }} for key in keys.values()]}
+
+        response = api_client.post(self.url, json.dumps(s3_event), content_type="application/json",
+                                   X_NGINX_SOURCE='internal', X_SSL_CLIENT_VERIFY='SUCCESS',
+                                   X_SSL_CLIENT_DN='/CN=document-management-s3-hook.test-internal')
+        AssertionHelper.HTTP_204(response)
+
+        queued = {call[0][0]: [record['key'] for record in call[0][1]] for call in mock_delay.call_args_list}
+        assert len(mock_delay.call_args_list) == len(queued)
+        for document in (document_shipment_alice, document_shipment_alice_two, document_shipment_two_alice):
+            assert keys[document.id] in queued[document.shipment.vault_id]
+
+    def test_idempotent(self, api_client, document_shipment_alice, mocker):
+        mock_delay = mocker.patch('apps.documents.tasks.add_documents_from_s3.delay')
         document_shipment_alice.upload_status = UploadStatus.COMPLETE
         document_shipment_alice.save()
 
@@ -71,7 +103,28 @@ class TestS3EventNotification:
                                    X_NGINX_SOURCE='internal', X_SSL_CLIENT_VERIFY='SUCCESS',
                                    X_SSL_CLIENT_DN='/CN=document-management-s3-hook.test-internal')
         AssertionHelper.HTTP_204(response)
+        mock_delay.assert_not_called()
         document_shipment_alice.refresh_from_db()
         assert document_shipment_alice.upload_status == UploadStatus.COMPLETE
         assert document_shipment_alice.history.count() == history_count
 
+    def test_missing_document_skipped(self, document_shipment_alice):
+        vault_id = random_id()
+        records = [{'bucket': 'document-management-s3-local', 'key': f'{random_id()}/{random_id()}/{vault_id}/{key}.png'}
+                   for key in (random_id(), document_shipment_alice.id)]
+
+        with mock.patch.object(requests.Session, 'post') as mock_method:
+            mock_method.return_value = mocked_rpc_response({
+                "jsonrpc": "2.0",
+                "result": {
+                    "success": True,
+                    "vault_signed": {
+                        'hash': 'VAULT_HASH'
+                    }
+                },
+                "id": 0
+            })
+            add_documents_from_s3(vault_id, records)
+
+        document_shipment_alice.refresh_from_db()
+        assert document_shipment_alice.upload_status == UploadStatus.COMPLETE
@@ -1,6 +1,8 @@
 import json
 from datetime import datetime, timezone
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytest import fixture
 from rest_framework import status
@@ -471,8 +473,9 @@ class TestAccessRequestPermissions:
         self.assert_write_access(client_bob, all_access=False)
 
         # Modify access request to RW
-        AccessRequest.objects.filter(id=approved_access_request_bob.id).update(**access_request_rw_attributes)
-        approved_access_request_bob.refresh_from_db()
+        for attribute, value in access_request_rw_attributes.items():
+            setattr(approved_access_request_bob, attribute, value)
+        approved_access_request_bob.save()
 
         # Test RW gives R
         self.assert_read_access(client_bob, all_access=True)
@@ -511,6 +514,14 @@ class TestAccessRequestPermissions:
         self.assert_read_access(client_bob, all_access=True)
         self.assert_write_access(client_bob, notes_access=True, shipment_access=False, tags_access=False, documents_access=False)
 
+    # Bob's permissions are answered from his cached permission map once it has been loaded
+    def test_access_request_permissions_cached(self, shipment_alice, client_bob, approved_access_request_bob):
+        self.assert_read_access(client_bob, True)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assert_read_access(client_bob, True)
+        assert not [query for query in context.captured_queries if 'shipments_accessrequest' in query['sql']]
+
     # Requesters should no longer have access to shipment details after revocation
     def test_revocation(self, shipment_alice, client_bob, approved_access_request_bob):
         self.assert_read_access(client_bob, True)
@@ -15,6 +15,9 @@ from datetime import datetime, timedelta
 
 import geojson
 import pytest
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from freezegun import freeze_time
 from geojson import Point
@@ -22,6 +25,8 @@ from shipchain_common.test_utils import AssertionHelper, create_form_content
 from shipchain_common.utils import random_id
 
 from apps.documents.models import Document
+from apps.shipments.models import Location, Shipment
+from apps.simple_history import TxmHistoricalRecords
 
 
 class TestShipmentHistory:
@@ -91,6 +96,64 @@ class TestShipmentHistory:
 
         assert response.json()['data'][0]['author'] == user_bob_id
 
+    def test_changes_persisted_on_write(self, client_alice):
+        response = client_alice.patch(self.update_url, data={'carriers_scac': 'carrier_scac'})
+        AssertionHelper.HTTP_202(response)
+
+        historical_shipment = self.shipment.history.first()
+        assert historical_shipment.history_changes
+        assert ['carriers_scac', None, 'carrier_scac'] in historical_shipment.history_changes['fields']
+
+        # The endpoint serves the persisted changes
+        response = client_alice.get(self.history_url)
+        AssertionHelper.HTTP_200(response, is_list=True, count=3)
+        assert 'carriers_scac' in self.get_changed_fields(response.json()['data'][0]['fields'], 'field')
+
+    def test_history_page_loaded_from_database(self, client_alice):
+        for package_qty in range(12):
+            self.shipment.anonymous_historical_change(package_qty=package_qty)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client_alice.get(self.history_url)
+        AssertionHelper.HTTP_200(response, is_list=True, count=14)
+        assert len(response.json()['data']) == settings.REST_FRAMEWORK['PAGE_SIZE']
+
+        # Count, page of merged keys and page of records, regardless of the history length
+        history_queries = [query for query in context.captured_queries
+                           if 'shipments_historicalshipment' in query['sql']]
+        assert len(history_queries) <= 3
+
+    def test_historical_record_write_queries(self):
+        self.shipment.ship_from_location = Location.objects.create(name='from')
+        self.shipment.ship_to_location = Location.objects.create(name='to')
+        self.shipment.save()
+
+        with CaptureQueriesContext(connection) as context:
+            historical_shipment = self.shipment.anonymous_historical_change(only_history=True)
+        # Related historical ids, previous record and the insert
+        assert len(context.captured_queries) == 3
+        assert historical_shipment.ship_from_location.history_id == \
+            self.shipment.ship_from_location.history.first().history_id
+        assert historical_shipment.ship_to_location.history_id == \
+            self.shipment.ship_to_location.history.first().history_id
+
+    def test_bulk_create_historical_records(self, shipment_alice_two):
+        shipments = list(Shipment.objects.filter(id__in=[self.shipment.id, shipment_alice_two.id]))
+        for shipment in shipments:
+            shipment.package_qty = 10
+
+        with CaptureQueriesContext(connection) as context:
+            historical_shipments = TxmHistoricalRecords().bulk_create_historical_records(shipments, '~')
+        # Previous records and the insert
+        assert len(context.captured_queries) == 2
+
+        assert {historical_shipment.id for historical_shipment in historical_shipments} == \
+            {shipment.id for shipment in shipments}
+        for shipment in shipments:
+            historical_shipment = shipment.history.first()
+            assert historical_shipment.package_qty == 10
+            assert ['package_qty', None, 10] in historical_shipment.history_changes['fields']
+
     def test_shipment_udate_customer_fields(self, client_alice):
         response = client_alice.patch(self.update_url, data={
             'customer_fields': {
@@ -149,6 +212,42 @@ class TestShipmentHistory:
         ship_from_location_changes = response.json()['data'][0]['relationships']['ship_from_location']
         assert 'phone_number' in self.get_changed_fields(ship_from_location_changes, 'field')
 
+    def test_location_history_prefetched(self, client_alice):
+        for phone_number in ('555-555-0001', '555-555-0002', '555-555-0003'):
+            location_attributes, content_type = create_form_content({
+                'ship_from_location.name': 'Location Name',
+                'ship_from_location.phone_number': phone_number,
+                'ship_to_location.name': 'Location Name',
+                'ship_to_location.phone_number': phone_number,
+            })
+            response = client_alice.patch(self.update_url, data=location_attributes, content_type=content_type)
+            AssertionHelper.HTTP_202(response)
+
+        # Records created before their changes were persisted are diffed against their previous record
+        Location.history.update(history_changes=None)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client_alice.get(self.history_url)
+        AssertionHelper.HTTP_200(response, is_list=True, count=5)
+        relationships = response.json()['data'][0]['relationships']
+        assert 'phone_number' in self.get_changed_fields(relationships['ship_from_location'], 'field')
+        assert 'phone_number' in self.get_changed_fields(relationships['ship_to_location'], 'field')
+
+        # The creation of the locations references them by id
+        self.shipment.refresh_from_db()
+        created_fields = {field['field']: field['new'] for field in response.json()['data'][2]['fields']}
+        assert created_fields['ship_from_location'] == self.shipment.ship_from_location_id
+        assert created_fields['ship_to_location'] == self.shipment.ship_to_location_id
+
+        # The page records join their locations, the predecessors are loaded with a single query
+        location_queries = [query for query in context.captured_queries
+                            if 'FROM "shipments_historicallocation"' in query['sql']]
+        assert len(location_queries) == 1
+
+        # Created locations are found among the joined records, not looked up one by one
+        assert not [query for query in location_queries
+                    if '"shipments_historicallocation"."history_id" =' in query['sql']]
+
     def test_history_documents(self, client_alice):
         document = Document.objects.create(name='Test Historical', owner_id=self.shipment.owner_id, shipment=self.shipment)
         response = client_alice.get(self.history_url)
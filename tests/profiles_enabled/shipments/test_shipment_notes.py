@@ -13,12 +13,18 @@
 #  limitations under the License.
 
 
+import json
+import threading
+from unittest import mock
+
 import pytest
 
+from requests.exceptions import RequestException
 from rest_framework import status
 from rest_framework.reverse import reverse
 from shipchain_common.test_utils import create_form_content, AssertionHelper
 
+from apps.permissions import has_wallet_access
 from apps.shipments.models import ShipmentNote
 
 
@@ -187,3 +193,70 @@ def test_list_search_filter(client_alice, shipper_api_client, api_client, shipme
                                                                             resource='Shipment', pk=shipment.id)})],
                              count=1
                              )
+
+
+@pytest.mark.django_db
+def test_wallet_access_cached(settings, shipper_api_client, shipment, mocked_is_shipper, shipment_notes,
+                              successful_wallet_owner_calls_assertions):
+    settings.PROFILES_WALLET_ACCESS_TTL = 60
+    url = reverse('shipment-notes-list', kwargs={'version': 'v1', 'shipment_pk': shipment.id})
+
+    # Profiles is only asked once for the shipper wallet across repeated requests
+    for _ in range(2):
+        response = shipper_api_client.get(url)
+        AssertionHelper.HTTP_200(response, is_list=True, count=len(shipment_notes) - 1)
+
+    mocked_is_shipper.assert_calls(successful_wallet_owner_calls_assertions)
+
+
+@pytest.mark.django_db
+def test_wallet_access_error_not_cached(settings, shipper_api_client, shipment, modified_http_pretty,
+                                        mocked_not_carrier, shipment_notes):
+    settings.PROFILES_WALLET_ACCESS_TTL = 60
+    url = reverse('shipment-notes-list', kwargs={'version': 'v1', 'shipment_pk': shipment.id})
+    shipper_wallet_url = f'{settings.PROFILES_URL}/api/v1/wallet/{shipment.shipper_wallet_id}/?is_active'
+
+    # A Profiles error denies the current request only
+    modified_http_pretty.register_uri(modified_http_pretty.GET, shipper_wallet_url,
+                                      body=json.dumps({'errors': []}), status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response = shipper_api_client.get(url)
+    AssertionHelper.HTTP_403(response)
+
+    modified_http_pretty.register_uri(modified_http_pretty.GET, shipper_wallet_url,
+                                      body=json.dumps({'good': 'good'}), status=status.HTTP_200_OK)
+    response = shipper_api_client.get(url)
+    AssertionHelper.HTTP_200(response, is_list=True, count=len(shipment_notes) - 1)
+
+
+@pytest.mark.django_db
+def test_concurrent_wallet_permission(settings, shipper_api_client, shipment, mocked_is_shipper,
+                                      mocked_not_carrier, shipment_notes):
+    settings.PROFILES_PERMISSION_WORKERS = 4
+    url = reverse('shipment-notes-list', kwargs={'version': 'v1', 'shipment_pk': shipment.id})
+
+    check_threads = []
+
+    def recording_wallet_access(request, wallet_id):
+        check_threads.append(threading.current_thread().name)
+        return has_wallet_access(request, wallet_id)
+
+    with mock.patch('apps.permissions.has_wallet_access', side_effect=recording_wallet_access):
+        # Access is granted when any of the concurrently checked wallets is accessible
+        response = shipper_api_client.get(url)
+    AssertionHelper.HTTP_200(response, is_list=True, count=len(shipment_notes) - 1)
+
+    # The checks ran on the pool of the request, sized from the settings when the request is handled
+    assert check_threads
+    assert all(name.startswith('profiles-permission') for name in check_threads)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('workers', [1, 4])
+def test_wallet_permission_profiles_error(settings, shipper_api_client, shipment, workers):
+    settings.PROFILES_PERMISSION_WORKERS = workers
+    url = reverse('shipment-notes-list', kwargs={'version': 'v1', 'shipment_pk': shipment.id})
+
+    # A Profiles outage surfaces, whether the checks run serially or concurrently
+    with mock.patch('apps.permissions.has_wallet_access', side_effect=RequestException('Profiles down')), \
+            pytest.raises(RequestException):
+        shipper_api_client.get(url)
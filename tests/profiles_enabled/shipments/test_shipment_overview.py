@@ -24,6 +24,7 @@ from shipchain_common.utils import random_id
 
 from apps.shipments.models import Shipment, Location, TrackingData, TransitState
 from apps.shipments.serializers import ActionType
+from apps.utils import invalidate_profiles_wallet_ids
 
 from tests.profiles_enabled.shipments.conftest import BBOX, NUM_DEVICES
 
@@ -132,6 +133,50 @@ def test_wallet_owner_retrieval(client_bob, api_client, shipment_tracking_data,
     modified_http_pretty.assert_calls(profiles_wallet_list_assertions)
 
 
+@pytest.mark.django_db
+def test_wallet_ids_cached(settings, client_bob, user_bob, shipment_tracking_data, modified_http_pretty, profiles_ids,
+                           profiles_wallet_list_assertions):
+    settings.PROFILES_WALLET_IDS_TTL = 60
+    modified_http_pretty.register_uri(modified_http_pretty.GET,
+                                      f"{settings.PROFILES_URL}/api/v1/wallet",
+                                      body=json.dumps({'data': []}), status=status.HTTP_200_OK)
+    url = reverse('shipment-overview', kwargs={'version': 'v1'})
+
+    # Profiles is only asked once for the wallet list across repeated requests
+    for _ in range(2):
+        response = client_bob.get(url)
+        AssertionHelper.HTTP_200(response, vnd=True, is_list=True, count=1)
+    modified_http_pretty.assert_calls(profiles_wallet_list_assertions)
+
+    modified_http_pretty.register_uri(modified_http_pretty.GET,
+                                      f"{settings.PROFILES_URL}/api/v1/wallet",
+                                      body=json.dumps({'data': [
+                                          {'id': profiles_ids['carrier_wallet_id']},
+                                          {'id': profiles_ids['shipper_wallet_id']},
+                                      ]}), status=status.HTTP_200_OK)
+
+    # Invalidating with a wallet missing from the cached list forces a refresh
+    invalidate_profiles_wallet_ids(user_bob.id, profiles_ids['shipper_wallet_id'])
+    response = client_bob.get(url)
+    AssertionHelper.HTTP_200(response, vnd=True, is_list=True, count=len(shipment_tracking_data))
+    modified_http_pretty.assert_calls(profiles_wallet_list_assertions)
+
+    modified_http_pretty.register_uri(modified_http_pretty.GET,
+                                      f"{settings.PROFILES_URL}/api/v1/wallet",
+                                      body=json.dumps({'data': []}), status=status.HTTP_200_OK)
+
+    # A wallet Profiles granted access to is in the cached list, the list stays cached
+    invalidate_profiles_wallet_ids(user_bob.id, profiles_ids['shipper_wallet_id'], has_access=True)
+    response = client_bob.get(url)
+    AssertionHelper.HTTP_200(response, vnd=True, is_list=True, count=len(shipment_tracking_data))
+
+    # A revoked wallet still in the cached list forces a refresh
+    invalidate_profiles_wallet_ids(user_bob.id, profiles_ids['shipper_wallet_id'], has_access=False)
+    response = client_bob.get(url)
+    AssertionHelper.HTTP_200(response, vnd=True, is_list=True, count=1)
+    modified_http_pretty.assert_calls(profiles_wallet_list_assertions)
+
+
 def test_ordering(client_alice, api_client, shipment_tracking_data, mocked_profiles_wallet_list,
                   profiles_wallet_list_assertions):
     url = reverse('shipment-overview', kwargs={'version': 'v1'})
@@ -19,6 +19,8 @@ import geojson
 import pytest
 from django.conf import settings
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from geojson import Point
 from moto import mock_sns
@@ -27,6 +29,7 @@ from shipchain_common.utils import random_id
 from copy import deepcopy
 
 from apps.routes.models import RouteTrackingData
+from apps.shipments.geojson import render_point_feature
 from apps.shipments.models import Shipment, Location, TrackingData
 
 
@@ -185,6 +188,24 @@ class TestShipmentsList:
                                  count=len([*bob_organization_shipment_fixtures, *alice_organization_shipment_fixtures]))
         modified_http_pretty.assert_calls(self.profiles_assertions)
 
+    def test_list_query_count(self, client_alice, alice_organization_shipments, mocked_profiles_wallet_list):
+        def list_query_count():
+            with CaptureQueriesContext(connection) as context:
+                response = client_alice.get(self.url)
+            AssertionHelper.HTTP_200(response, is_list=True, count=len(alice_organization_shipments))
+            return len(context.captured_queries)
+
+        bare_query_count = list_query_count()
+
+        # Included relations are preloaded with the page, so populating them must not add per-shipment queries
+        for shipment in alice_organization_shipments:
+            shipment.ship_from_location = Location.objects.create(name='from')
+            shipment.ship_to_location = Location.objects.create(name='to')
+            shipment.save()
+            shipment.shipment_tags.create(owner_id=shipment.owner_id, tag_type='type', tag_value=shipment.id)
+
+        assert list_query_count() == bare_query_count
+
     def test_filter_shipments(self, client_alice, alice_organization_shipment_fixtures, alice_organization_shipments,
                               mocked_profiles_wallet_list):
         location = Location.objects.create(name="location")
@@ -258,6 +279,64 @@ class TestShipmentsList:
         AssertionHelper.HTTP_200(response, is_list=True, count=0)
         mocked_profiles_wallet_list.assert_calls(self.profiles_assertions)
 
+    def test_sparse_fieldset(self, client_alice, alice_organization_shipments, mocked_profiles_wallet_list):
+        for shipment in alice_organization_shipments:
+            shipment.shippers_reference = 'Reference'
+            shipment.save()
+        alice_organization_shipments[0].ship_to_location = Location.objects.create(name='to')
+        alice_organization_shipments[0].save()
+        url = f'{self.url}?fields[Shipment]=shippers_reference,state'
+
+        # Warms up the cached permission lookups, so that both requests below run the same queries
+        client_alice.get(url)
+
+        with CaptureQueriesContext(connection) as single_context:
+            response = client_alice.get(f'{url}&has_ship_to_location=true')
+        AssertionHelper.HTTP_200(response, is_list=True, count=1)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client_alice.get(url)
+        AssertionHelper.HTTP_200(response, is_list=True, count=len(alice_organization_shipments))
+
+        for shipment in response.json()['data']:
+            assert set(shipment['attributes']) == {'shippers_reference', 'state'}
+            assert 'relationships' not in shipment
+        assert not response.json().get('included')
+
+        # The number of queries doesn't grow with the number of shipments listed
+        assert len(context.captured_queries) == len(single_context.captured_queries)
+
+        # Columns and relations outside of the fieldset are not loaded
+        shipment_queries = [query['sql'] for query in context.captured_queries
+                            if 'FROM "shipments_shipment"' in query['sql']]
+        assert shipment_queries
+        assert not [sql for sql in shipment_queries if '"customer_fields"' in sql or 'shipments_location' in sql]
+
+    def test_search_document_maintained(self, client_alice, alice_organization_shipment_fixtures,
+                                        alice_organization_shipments, mocked_profiles_wallet_list):
+        location = Location.objects.create(name='Origin')
+        alice_organization_shipments[0].ship_from_location = location
+        alice_organization_shipments[0].save()
+        tag = alice_organization_shipments[1].shipment_tags.create(
+            owner_id=alice_organization_shipments[1].owner_id, tag_type='Reefer', tag_value='Frozen')
+
+        response = client_alice.get(f'{self.url}?search=origin')
+        AssertionHelper.HTTP_200(response, is_list=True, entity_refs=alice_organization_shipment_fixtures[0], count=1)
+        response = client_alice.get(f'{self.url}?search=froz')
+        AssertionHelper.HTTP_200(response, is_list=True, entity_refs=alice_organization_shipment_fixtures[1], count=1)
+
+        # Editing a referenced Location or removing a tag updates the search document of the shipment
+        location.name = 'Warehouse'
+        location.save()
+        tag.delete()
+
+        response = client_alice.get(f'{self.url}?search=origin')
+        AssertionHelper.HTTP_200(response, is_list=True, count=0)
+        response = client_alice.get(f'{self.url}?search=warehouse')
+        AssertionHelper.HTTP_200(response, is_list=True, entity_refs=alice_organization_shipment_fixtures[0], count=1)
+        response = client_alice.get(f'{self.url}?search=froz')
+        AssertionHelper.HTTP_200(response, is_list=True, count=0)
+
     def test_customer_fields_filter(self, client_alice, alice_organization_shipment_fixtures, alice_organization_shipments,
                                     mocked_profiles_wallet_list):
         customer_fields = {
@@ -277,6 +356,25 @@ class TestShipmentsList:
                                      count=1)
             mocked_profiles_wallet_list.assert_calls(self.profiles_assertions)
 
+    def test_customer_fields_containment(self, client_alice, alice_organization_shipment_fixtures,
+                                         alice_organization_shipments, mocked_profiles_wallet_list):
+        customer_fields = {'reference': {'po': 'PO-1'}, 'count': 5}
+        alice_organization_shipments[0].customer_fields = customer_fields
+        alice_organization_shipments[0].save()
+        alice_organization_shipment_fixtures[0].attributes['customer_fields'] = customer_fields
+
+        # Nested key equality is served by a containment query
+        with CaptureQueriesContext(connection) as context:
+            response = client_alice.get(f'{self.url}?customer_fields__reference__po={json.dumps("PO-1")}')
+        AssertionHelper.HTTP_200(response, is_list=True, entity_refs=alice_organization_shipment_fixtures[0], count=1)
+        assert [query for query in context.captured_queries if '@>' in query['sql']]
+
+        # Explicit lookups are still supported
+        response = client_alice.get(f'{self.url}?customer_fields__count__gt=3')
+        AssertionHelper.HTTP_200(response, is_list=True, entity_refs=alice_organization_shipment_fixtures[0], count=1)
+        response = client_alice.get(f'{self.url}?customer_fields__count__gt=5')
+        AssertionHelper.HTTP_200(response, is_list=True, count=0)
+
     def test_customer_fields_search(self, client_alice, alice_organization_shipment_fixtures,
                                     alice_organization_shipments, mocked_profiles_wallet_list):
         customer_fields = {
@@ -1013,3 +1111,39 @@ class TestTrackingRetrieval:
         response_json = response.json()['data']
         assert response_json['type'] == 'FeatureCollection'
         assert len(response_json['features']) == 0
+
+    def test_tracking_signal_sends_rendered_frame(self):
+        with mock.patch('apps.consumers.send_shipment_event') as mock_send:
+            self.add_tracking_data_to_object([self.unsigned_tracking], self.shipment)
+
+        assert mock_send.call_count == 1
+        shipment, message = mock_send.call_args[0]
+        assert shipment == self.shipment
+        assert message['type'] == 'tracking_data.save'
+        frame = json.loads(message['tracking_data_json'])
+        assert frame['data']['shipment_id'] == self.shipment.id
+        assert frame['data']['feature']['geometry']['coordinates'] == [self.unsigned_tracking['longitude'],
+                                                                      self.unsigned_tracking['latitude']]
+
+    def test_route_tracking_signal_renders_once(self, route_with_device_alice, shipment_alice, shipment_alice_two):
+        for shipment in (shipment_alice, shipment_alice_two):
+            route_with_device_alice.routeleg_set.create(shipment=shipment)
+            shipment.pick_up(action_timestamp=(datetime.utcnow() - timedelta(days=1)).isoformat())
+            shipment.save()
+
+        with mock.patch('apps.consumers.send_shipment_event') as mock_send, \
+                mock.patch('apps.shipments.geojson.render_point_feature', wraps=render_point_feature) as mock_render:
+            self.add_tracking_data_to_object([self.unsigned_tracking], route_with_device_alice)
+
+        # One frame rendered for the Route, sent with the shipment id of each leg
+        assert mock_render.call_count == 1
+        assert mock_send.call_count == 2
+        sent = {}
+        for shipment, message in (call[0] for call in mock_send.call_args_list):
+            assert message['type'] == 'tracking_data.save'
+            sent[shipment.id] = json.loads(message['tracking_data_json'])
+        assert set(sent) == {shipment_alice.id, shipment_alice_two.id}
+        for shipment_id, frame in sent.items():
+            assert frame['data']['shipment_id'] == shipment_id
+            assert frame['data']['feature']['geometry']['coordinates'] == [self.unsigned_tracking['longitude'],
+                                                                          self.unsigned_tracking['latitude']]
@@ -16,6 +16,8 @@ from datetime import timedelta, datetime
 
 import pytest
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from moto import mock_iot
 from rest_framework import status
@@ -117,6 +119,16 @@ class TestRetrieveTelemetryData:
         self.unsigned_telemetry.pop('version')
         AssertionHelper.HTTP_200(response, is_list=True, vnd=False, attributes=self.unsigned_telemetry)
 
+    def test_shipment_fetched_once(self, client_alice):
+        with CaptureQueriesContext(connection) as context:
+            response = client_alice.get(self.telemetry_url)
+        AssertionHelper.HTTP_200(response, is_list=True, vnd=False)
+
+        # Permissions, queryset and serializer selection share a single Shipment lookup
+        shipment_queries = [query for query in context.captured_queries
+                            if 'FROM "shipments_shipment"' in query['sql']]
+        assert len(shipment_queries) == 1
+
     def test_filter_sensor(self, client_alice, unsigned_telemetry_different_sensor):
         add_telemetry_data_to_model([unsigned_telemetry_different_sensor],
                                     self.shipment_alice_with_device)
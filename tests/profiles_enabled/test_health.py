@@ -0,0 +1,42 @@
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from apps.management.views import MigrationCheck
+
+
+class TestHealth:
+    def test_health_migration_plan_cached(self, api_client):
+        MigrationCheck.applied, MigrationCheck.checked_at = False, None
+
+        response = api_client.get(reverse('health'))
+        assert response.status_code == status.HTTP_200_OK
+
+        # The migration plan isn't built again once the migrations are applied
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(reverse('health'))
+        assert response.status_code == status.HTTP_200_OK
+        assert not context.captured_queries
+
+    def test_liveness(self, api_client):
+        response = api_client.get(reverse('health-live'))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_readiness(self, api_client):
+        response = api_client.get(reverse('health-ready'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'database': True, 'cache': True, 'channel_layer': True, 'migrations': True}
+
+    def test_readiness_database_timeout(self, api_client):
+        with override_settings(HEALTH_CHECK_TIMEOUT=0.1), \
+                mock.patch('apps.management.views.check_database', side_effect=lambda: time.sleep(1)):
+            response = api_client.get(reverse('health-ready'))
+
+        # A hung database doesn't hold the probe past HEALTH_CHECK_TIMEOUT
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json() == {'database': False, 'cache': True, 'channel_layer': True, 'migrations': False}
@@ -0,0 +1,67 @@
+import logging
+import queue
+import threading
+from unittest.mock import Mock, patch
+
+from apps.log_handlers import CloudWatchQueueListener, QueuedCloudWatchLogHandler
+
+
+def make_record(message):
+    return logging.LogRecord('transmission', logging.INFO, __file__, 1, message, None, None)
+
+
+class TestQueuedCloudWatchLogHandler:
+    def test_dropped_when_queue_full(self):
+        handler = QueuedCloudWatchLogHandler(max_queue_size=1)
+        with patch.object(handler, '_ensure_listener'), patch('apps.log_handlers.log_metric') as mock_metric:
+            handler.emit(make_record('queued'))
+            handler.emit(make_record('dropped'))
+
+        assert handler.queue.get_nowait().getMessage() == 'queued'
+        mock_metric.assert_called_once_with('transmission.logs_dropped',
+                                            tags={'handler': 'cloudwatch', 'module': 'apps.log_handlers'})
+
+    def test_dropped_when_cloudwatch_backlog_full(self):
+        cloudwatch_handler = Mock(level=logging.NOTSET, queues={'stream': Mock(qsize=Mock(return_value=2))})
+        on_drop = Mock()
+        listener = CloudWatchQueueListener(queue.Queue(), {}, 2, on_drop)
+        listener.cloudwatch_handler = cloudwatch_handler
+        listener.handlers = (cloudwatch_handler,)
+
+        listener.handle(make_record('dropped'))
+        assert on_drop.call_count == 1
+        assert not cloudwatch_handler.handle.called
+
+        cloudwatch_handler.queues['stream'].qsize.return_value = 1
+        listener.handle(make_record('shipped'))
+        assert on_drop.call_count == 1
+        assert cloudwatch_handler.handle.call_count == 1
+
+    def test_cloudwatch_handler_created_by_listener(self):
+        cloudwatch_handler = Mock(level=logging.NOTSET, queues={})
+        creating_threads = []
+
+        def create_cloudwatch_handler(**kwargs):
+            creating_threads.append(threading.current_thread())
+            return cloudwatch_handler
+
+        handler = QueuedCloudWatchLogHandler(max_queue_size=10, log_group='transmission')
+        with patch('apps.log_handlers.watchtower.CloudWatchLogHandler', side_effect=create_cloudwatch_handler):
+            handler.emit(make_record('shipped'))
+            handler.close()
+
+        # The logging thread never waits on the handler creation, which calls CloudWatch
+        assert creating_threads and creating_threads[0] is not threading.current_thread()
+        assert cloudwatch_handler.handle.call_args[0][0].getMessage() == 'shipped'
+        assert cloudwatch_handler.close.called
+
+    def test_close_with_full_queue(self):
+        on_drop = Mock()
+        log_queue = queue.Queue(maxsize=1)
+        log_queue.put_nowait(make_record('dropped'))
+        listener = CloudWatchQueueListener(log_queue, {}, 1, on_drop)
+
+        # Room is made for the stop sentinel, counting the dropped record
+        listener.enqueue_sentinel()
+        assert on_drop.call_count == 1
+        assert log_queue.get_nowait() is listener._sentinel
@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+from apps.metrics import MetricsBuffer
+
+
+class TestMetricsBuffer:
+    def test_aggregated_and_bounded(self):
+        buffer = MetricsBuffer(flush_interval=60, max_series=2)
+        with patch.object(buffer, '_ensure_process'):
+            buffer.add('transmission.info', tags={'method': 'a', 'module': 'm'})
+            buffer.add('transmission.info', tags={'module': 'm', 'method': 'a'})
+            buffer.add('transmission.info', tags={'method': 'b'}, fields={'value': 3})
+            # Third series, dropped
+            buffer.add('transmission.error', tags={'method': 'a'})
+
+        points = {(point['measurement'], tuple(sorted(point['tags'].items()))): point['fields']
+                  for point in buffer.drain()}
+        assert points == {
+            ('transmission.info', (('method', 'a'), ('module', 'm'))): {'value': 2},
+            ('transmission.info', (('method', 'b'),)): {'value': 3},
+            ('transmission.metrics_dropped', (('module', 'apps.metrics'),)): {'value': 1},
+        }
+        assert not buffer.drain()
+
+    def test_points_with_text_fields_kept(self):
+        buffer = MetricsBuffer(flush_interval=60, max_series=3)
+        tags = {'method': 'event.transfer', 'project': 'ShipToken'}
+        with patch.object(buffer, '_ensure_process'):
+            buffer.add('transmission.info', tags=tags,
+                       fields={'from_address': '0xA', 'to_address': '0xB', 'token_amount': 1.5, 'count': 1})
+            buffer.add('transmission.info', tags=tags,
+                       fields={'from_address': '0xC', 'to_address': '0xD', 'token_amount': 2.0, 'count': 1})
+            buffer.add('transmission.info', tags={'method': 'a'})
+            # Over the bound shared by the series and the individual points, dropped
+            buffer.add('transmission.info', tags=tags,
+                       fields={'from_address': '0xE', 'to_address': '0xF', 'token_amount': 3.0, 'count': 1})
+
+        points = buffer.drain()
+        assert sorted(point['fields'].get('from_address', '') for point in points) == ['', '', '0xA', '0xC']
+        transfers = [point for point in points if point['tags'] == tags]
+        assert [point['fields'] for point in transfers] == [
+            {'from_address': '0xA', 'to_address': '0xB', 'token_amount': 1.5, 'count': 1},
+            {'from_address': '0xC', 'to_address': '0xD', 'token_amount': 2.0, 'count': 1},
+        ]
+        assert all(point['time'] for point in transfers)
+        assert {'measurement': 'transmission.metrics_dropped', 'tags': {'module': 'apps.metrics'},
+                'fields': {'value': 1}} in [{key: point[key] for key in ('measurement', 'tags', 'fields')}
+                                            for point in points]
+
+    def test_flush_failure_swallowed(self):
+        buffer = MetricsBuffer(flush_interval=60, max_series=10)
+        with patch.object(buffer, '_ensure_process'):
+            buffer.add('transmission.info', tags={'method': 'a'})
+
+        with patch.object(buffer, 'get_client') as mock_client:
+            mock_client.return_value.write_points.side_effect = ConnectionError('influx down')
+            buffer.flush()
+            assert mock_client.return_value.write_points.call_count == 1
+
+        assert not buffer.drain()
+
+    def test_forked_process_starts_empty(self):
+        buffer = MetricsBuffer(flush_interval=60, max_series=10)
+        with patch.object(buffer, '_run'):
+            buffer.add('transmission.info', tags={'method': 'parent'})
+            parent_lock = buffer._lock
+
+            # Simulates the first metric logged in a forked worker
+            buffer._pid = -1
+            buffer.add('transmission.info', tags={'method': 'child'})
+
+        assert buffer._lock is not parent_lock
+        assert [point['tags'] for point in buffer.drain()] == [{'method': 'child'}]
@@ -19,17 +19,23 @@ from unittest import mock
 import copy
 import os
 
+import pytest
 import requests
 import pyexcel
 from django.conf import settings
+from django.test import override_settings
+from moto import mock_s3
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework_json_api.serializers import ValidationError
 from shipchain_common.test_utils import get_jwt, random_timestamp
+from shipchain_common.utils import random_id
 
 from apps.authentication import passive_credentials_auth
 from apps.imports.models import ShipmentImport, FileType, UploadStatus, ProcessingStatus
+from apps.imports.processor import ShipmentImportProcessor
+from apps.shipments.models import Location, Shipment
 
 
 OWNER_ID = '5e8f1d76-162d-4f21-9b71-2ca97306ef7c'
@@ -317,3 +323,145 @@ class ShipmentImportsViewSetAPITests(APITestCase):
             self.assertEqual(data[0]['attributes']['processing_status'], ProcessingStatus.COMPLETE.name)
 
 
+class TestShipmentImportProcessor:
+    @pytest.fixture(autouse=True)
+    def set_up(self, mocked_engine_rpc):
+        s3_mock = mock_s3()
+        s3_mock.start()
+        self.bucket = settings.S3_RESOURCE.create_bucket(Bucket=settings.SHIPMENT_IMPORTS_BUCKET)
+        yield
+        self.bucket.objects.all().delete()
+        self.bucket.delete()
+        s3_mock.stop()
+
+    def create_import(self, file_type, content):
+        shipment_import = ShipmentImport.objects.create(name='Import', owner_id=OWNER_ID, masquerade_id=OWNER_ID,
+                                                        storage_credentials_id=STORAGE_CRED_ID,
+                                                        shipper_wallet_id=SHIPPER_WALLET_ID,
+                                                        carrier_wallet_id=CARRIER_WALLET_ID,
+                                                        file_type=file_type, upload_status=UploadStatus.COMPLETE)
+        self.bucket.put_object(Key=shipment_import.s3_key, Body=content.encode())
+        return shipment_import
+
+    def test_process_csv(self):
+        shipment_import = self.create_import(FileType.CSV, (
+            'shippers_reference,package_qty,ship_from_location.name,ship_from_location.city\n'
+            'REF-1,1,Warehouse,Greenville\n'
+            'REF-2,not a number,,\n'
+            'REF-3,3,,\n'
+        ))
+
+        with override_settings(SHIPMENT_IMPORT_CHUNK_SIZE=2):
+            ShipmentImportProcessor(shipment_import).process()
+
+        shipment_import.refresh_from_db()
+        assert shipment_import.processing_status == ProcessingStatus.COMPLETE
+        assert shipment_import.report['rows'] == 3
+        assert shipment_import.report['created'] == 2
+        assert shipment_import.report['failed'] == 1
+        assert shipment_import.report['errors'][0]['row'] == 3
+        assert 'package_qty' in shipment_import.report['errors'][0]['errors']
+
+        shipments = list(Shipment.objects.filter(owner_id=OWNER_ID).order_by('shippers_reference'))
+        assert [shipment.shippers_reference for shipment in shipments] == ['REF-1', 'REF-3']
+        assert shipments[0].ship_from_location.city == 'Greenville'
+        assert shipments[1].ship_from_location is None
+        for shipment in shipments:
+            assert shipment.vault_id
+            assert shipment.shipper_wallet_id == SHIPPER_WALLET_ID
+            assert shipment.loadshipment
+            assert shipment.history.count() == 1
+            assert shipment.search_document.document
+
+    def test_protected_columns_ignored(self):
+        row_id = random_id()
+        shipment_import = self.create_import(FileType.CSV, (
+            'id,asset_physical_id,shippers_reference\n'
+            f'{row_id},ASSET-1,REF-1\n'
+            f'{row_id},ASSET-2,REF-2\n'
+        ))
+
+        ShipmentImportProcessor(shipment_import).process()
+
+        shipment_import.refresh_from_db()
+        assert shipment_import.processing_status == ProcessingStatus.COMPLETE
+        assert shipment_import.report['created'] == 2
+
+        # Rows can't set the primary key or fields the shipment create API doesn't accept
+        shipments = list(Shipment.objects.filter(owner_id=OWNER_ID))
+        assert len(shipments) == 2
+        assert row_id not in {shipment.id for shipment in shipments}
+        assert all(shipment.asset_physical_id is None for shipment in shipments)
+
+    def test_failed_import_resumed(self):
+        shipment_import = self.create_import(FileType.CSV, (
+            'shippers_reference\n'
+            'REF-1\n'
+            'REF-2\n'
+            'REF-3\n'
+        ))
+
+        def build_search_document(shipment):
+            if shipment.shippers_reference == 'REF-3':
+                raise ValueError('Search document failure')
+            return shipment.shippers_reference
+
+        with override_settings(SHIPMENT_IMPORT_CHUNK_SIZE=2), \
+                mock.patch('apps.imports.processor.build_search_document', side_effect=build_search_document):
+            with pytest.raises(ValueError):
+                ShipmentImportProcessor(shipment_import).process()
+
+        # The first chunk is committed, the failed one is rolled back
+        shipment_import.refresh_from_db()
+        assert shipment_import.processing_status == ProcessingStatus.FAILED
+        assert shipment_import.report['last_row'] == 3
+        assert shipment_import.report['rows'] == 2
+        assert shipment_import.report['created'] == 2
+        assert Shipment.objects.filter(owner_id=OWNER_ID).count() == 2
+
+        with override_settings(SHIPMENT_IMPORT_CHUNK_SIZE=2):
+            ShipmentImportProcessor(shipment_import).process()
+
+        shipment_import.refresh_from_db()
+        assert shipment_import.processing_status == ProcessingStatus.COMPLETE
+        assert 'error' not in shipment_import.report
+        assert shipment_import.report['last_row'] == 4
+        assert shipment_import.report['rows'] == 3
+        assert shipment_import.report['created'] == 3
+        assert sorted(Shipment.objects.filter(owner_id=OWNER_ID).values_list('shippers_reference', flat=True)) == \
+            ['REF-1', 'REF-2', 'REF-3']
+
+    def test_vault_failure(self):
+        shipment_import = self.create_import(FileType.CSV, (
+            'shippers_reference,ship_from_location.name\n'
+            'REF-1,Warehouse\n'
+            'REF-2,Port\n'
+        ))
+        create_vault = ShipmentImportProcessor.create_vault
+
+        def fail_vault(processor, shipment):
+            if shipment.shippers_reference == 'REF-2':
+                return None
+            return create_vault(processor, shipment)
+
+        with mock.patch.object(ShipmentImportProcessor, 'create_vault', autospec=True, side_effect=fail_vault):
+            ShipmentImportProcessor(shipment_import).process()
+
+        shipment_import.refresh_from_db()
+        assert shipment_import.processing_status == ProcessingStatus.COMPLETE
+        assert shipment_import.report['created'] == 1
+        assert shipment_import.report['errors'] == [{'row': 3, 'errors': {'vault': ['Invalid response from Engine']}}]
+
+        # The shipment without a vault isn't kept, nor its location
+        assert list(Shipment.objects.filter(owner_id=OWNER_ID).values_list('shippers_reference', flat=True)) == \
+            ['REF-1']
+        assert not Location.objects.filter(name='Port').exists()
+
+    def test_spreadsheet_not_supported(self):
+        shipment_import = self.create_import(FileType.XLSX, 'not a spreadsheet')
+
+        ShipmentImportProcessor(shipment_import).process()
+
+        shipment_import.refresh_from_db()
+        assert shipment_import.processing_status == ProcessingStatus.FAILED
+        assert 'XLSX imports are not supported' in shipment_import.report['error']
@@ -74,3 +74,24 @@ class TestShipmentAPIThrottling:
         # Call for someone not in an org should succeed
         response = client_lionel.post(url, post_data, content_type='application/vnd.api+json')
         assert response.status_code == status.HTTP_202_ACCEPTED
+
+    def test_sliding_window(self, client_alice_throttled, mock_successful_wallet_owner_calls,
+                            mocked_profiles_wallet_list, mocked_engine_rpc, mocked_iot_api):
+        url = reverse('shipment-list', kwargs={'version': 'v1'})
+        post_data = replace_variables_in_string(self.post_template, self.variables)
+        start = datetime(2020, 3, 10, 12)
+
+        with freeze_time(start):
+            response = client_alice_throttled.post(url, post_data, content_type='application/vnd.api+json')
+            assert response.status_code == status.HTTP_202_ACCEPTED
+
+        # The request is still within the window after the calendar month changes
+        with freeze_time(start + timedelta(days=25)):
+            response = client_alice_throttled.post(url, post_data, content_type='application/vnd.api+json')
+            assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+            # Retry once the first request drops out of the window
+            assert 0 < int(response['Retry-After']) <= 6 * 86400
+
+        with freeze_time(start + timedelta(days=31)):
+            response = client_alice_throttled.post(url, post_data, content_type='application/vnd.api+json')
+            assert response.status_code == status.HTTP_202_ACCEPTED